@@ -0,0 +1,58 @@
+import numpy as np
+
+from calc_mO3 import calc_mO3
+
+def GetEvaluation(UEFC, N, R, mpay, AR, S):
+
+    # Evaluate the whole UEFC model for batches of designs at once. N, R, mpay,
+    # AR and S may be scalars or any broadcastable NumPy arrays; every Get* 
+    # function is elementwise, so the model is evaluated in a single NumPy 
+    # pass. Returns a dict of arrays of the broadcast shape (struct-of-arrays).
+    N, R, mpay, AR, S = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) 
+                                              for x in (N, R, mpay, AR, S)])
+    opt_vars = (N, R, mpay)
+    shape    = N.shape
+    
+    weight_data = UEFC.weight(opt_vars, AR, S)
+    CD_data     = UEFC.drag_coefficient(opt_vars, AR, S)
+    
+    V     = UEFC.flight_velocity(opt_vars, AR, S)
+    T     = UEFC.required_thrust(opt_vars, AR, S)
+    Tmax  = UEFC.maximum_thrust(V)
+    CL    = UEFC.lift_coefficient(opt_vars, AR, S)
+    db    = UEFC.wing_tip_deflection(opt_vars, AR, S)
+    
+    data = {
+            "N":        N,
+            "R":        R,
+            "mpay":     mpay,
+            "AR":       AR,
+            "S":        S,
+            "V":        V,
+            "CL":       CL,
+            "e":        UEFC.span_efficiency(opt_vars, AR, S),
+            "CD":       CD_data["Total"],
+            "CDfuse":   CD_data["Breakdown"]["Fuselage"],
+            "CDp":      CD_data["Breakdown"]["Wing"],
+            "CDpay":    CD_data["Breakdown"]["Payload"],
+            "CDi":      CD_data["Breakdown"]["Induced"],
+            "W":        weight_data["Total"],
+            "Wfuse":    weight_data["Breakdown"]["Fuselage"],
+            "Wwing":    weight_data["Breakdown"]["Wing"],
+            "Wpay":     weight_data["Breakdown"]["Payload"],
+            "db":       db,
+            "T":        T,
+            "Tmax":     Tmax,
+            "Omega":    UEFC.turn_rate(opt_vars, AR, S),
+            "mO3":      calc_mO3(UEFC, opt_vars, AR, S),
+            }
+    
+    # Constraints of opt_mO3, for pre-screening feasibility
+    data["Feasible"] = (Tmax-T >= 0) & (db <= UEFC.dbmax) & (CL <= UEFC.CLdes)
+    
+    # Quantities that do not depend on every input (e.g. Wfuse, CDpay) are 
+    # broadcast to the common shape
+    for key, value in data.items():
+        data[key] = np.broadcast_to(value, shape)
+    
+    return data
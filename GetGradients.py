@@ -0,0 +1,44 @@
+import numpy as np
+
+from calc_mO3 import calc_mO3
+
+# Complex step size. The complex step derivative Im(f(x + ih))/h has no 
+# subtractive cancellation, so it is exact to machine precision for any h 
+# small enough to make the truncation error vanish.
+H = 1e-30
+
+def GetGradients(UEFC, opt_vars, AR, S):
+
+    # Gradients of the objective and constraint quantities with respect to 
+    # (N, R, mpay, AR, S). The Get* functions are analytic, so evaluating them
+    # at complex points x + iH e_k gives every partial derivative to machine
+    # precision (forward-mode differentiation). All five directions are 
+    # evaluated in one vectorized pass over the model.
+    values, gradients = complex_step(UEFC, opt_vars, AR, S)
+    
+    return gradients
+
+
+def complex_step(UEFC, opt_vars, AR, S, nvars=5):
+
+    # Values and gradients of mO3, excess thrust, d/b and CL with respect to 
+    # the first nvars of (N, R, mpay, AR, S). The inputs may be broadcastable
+    # arrays; gradients have an extra trailing axis of length nvars.
+    x = np.stack(np.broadcast_arrays(opt_vars[0], opt_vars[1], opt_vars[2], 
+                                     AR, S), axis=-1).astype(complex)
+    X = x[...,np.newaxis,:] + 1j*H*np.eye(5)[:nvars]
+    
+    N, R, mpay, ARc, Sc = np.moveaxis(X, -1, 0)
+    opt_varsc = (N, R, mpay)
+    
+    data = {
+            "mO3":              calc_mO3(UEFC, opt_varsc, ARc, Sc),
+            "Excess thrust":    UEFC.excess_thrust(opt_varsc, ARc, Sc),
+            "Tip deflection":   UEFC.wing_tip_deflection(opt_varsc, ARc, Sc),
+            "Lift coefficient": UEFC.lift_coefficient(opt_varsc, ARc, Sc),
+            }
+    
+    values    = {key: np.real(value[...,0]) for key, value in data.items()}
+    gradients = {key: np.imag(value)/H      for key, value in data.items()}
+    
+    return values, gradients
@@ -1,6 +1,7 @@
 # Implement UEFC (Unified Engineering Flight Competition) aircraft as a class.
 
 import numpy as np
+from contextlib import contextmanager
 
 from GetWingDimensions import GetWingDimensions
 
@@ -25,6 +26,22 @@ from GetExcessThrust import GetExcessThrust
 
 from GetOmega import GetOmega
 
+from GetEvaluation import GetEvaluation
+from GetGradients import GetGradients
+
+
+# Maximum number of memoized results kept by UEFC.evaluation_context
+MEMO_SIZE = 4096
+
+
+def _point_key(arg):
+    # Hashable key for a scalar or an opt_vars vector. Batches of designs
+    # (tuples of arrays, large arrays) are returned as is and are unhashable.
+    if type(arg) is np.ndarray and arg.ndim == 1 and arg.size <= 8 \
+            and arg.dtype == np.float64:
+        return arg.tobytes()
+    return arg
+
 
 class UEFC:
     def __init__(
@@ -64,6 +81,42 @@ class UEFC:
         self.mu = mu  # dynamic viscosity of air N s/m^2
         self.g = g  # gravity, m/s^2
 
+        # Memoized method results while inside evaluation_context() (else None)
+        self.memo = None
+
+    @contextmanager
+    def evaluation_context(self):
+        # Within this context, the result of every model method below is
+        # memoized on its arguments (opt_vars, AR, S, ...), so each
+        # intermediate quantity (V, W, wing dimensions, CL, ...) is computed
+        # once per design point and shared by the objective, all constraints
+        # and any report evaluated at that point. Array inputs (as used by
+        # evaluate) bypass the memo. Do not change the aircraft parameters
+        # inside the context, and treat returned dicts as read-only.
+        outer = self.memo
+        if outer is None:
+            self.memo = {}
+        try:
+            yield self
+        finally:
+            self.memo = outer
+
+    def _call(self, fcn, *args):
+        memo = self.memo
+        if memo is None:
+            return fcn(self, *args)
+
+        key = (fcn,) + tuple(map(_point_key, args))
+        try:
+            return memo[key]
+        except KeyError:
+            if len(memo) > MEMO_SIZE:
+                memo.clear()
+            value = memo[key] = fcn(self, *args)
+            return value
+        except TypeError:  # Unhashable (batch) inputs: do not memoize
+            return fcn(self, *args)
+
     # opt_vars is a vector representing the optimization variables
     # opt_vars[0]: Load factor (-)
     # opt_vars[1]: Turn radius (meters)
@@ -71,55 +124,61 @@ class UEFC:
 
     # YOU SHOULD NOT NEED TO CHANGE THESE METHOD CALLS
     def fuselage_weight(self, AR, S):
-        return GetWfuse(self, AR, S)  # Fuselage weight (N)
+        return self._call(GetWfuse, AR, S)  # Fuselage weight (N)
 
     def wing_weight(self, AR, S):
-        return GetWingWeight(self, AR, S)  # Wing weight (N)
+        return self._call(GetWingWeight, AR, S)  # Wing weight (N)
 
     def payload_weight(self, opt_vars, AR, S):
-        return GetWpay(self, opt_vars, AR, S)  # Payload weight (N)
+        return self._call(GetWpay, opt_vars, AR, S)  # Payload weight (N)
 
     def weight(self, opt_vars, AR, S):
-        return GetWeight(self, opt_vars, AR, S)  # Total weight; breakdown (N)
+        return self._call(GetWeight, opt_vars, AR, S)  # Total weight; breakdown (N)
 
     def mass(self, opt_vars, AR, S):
-        return GetMass(self, opt_vars, AR, S)  # Total mass, and a breakdown (g)
+        return self._call(GetMass, opt_vars, AR, S)  # Total mass, and a breakdown (g)
 
     def flight_velocity(self, opt_vars, AR, S):
-        return GetV(self, opt_vars, AR, S)  # Flight velocity (m/s)
+        return self._call(GetV, opt_vars, AR, S)  # Flight velocity (m/s)
 
     def lift_coefficient(self, opt_vars, AR, S):
-        return GetCL(self, opt_vars, AR, S)  # Lift coefficient (-)
+        return self._call(GetCL, opt_vars, AR, S)  # Lift coefficient (-)
 
     def span_efficiency(self, opt_vars, AR, S):
-        return Getspaneff(self, opt_vars, AR, S)  # Wing span efficiency (-)
+        return self._call(Getspaneff, opt_vars, AR, S)  # Wing span efficiency (-)
 
     def payload_drag_coefficient(self, opt_vars, AR, S):
-        return GetCDpay(self, opt_vars, AR, S)  # Payload drag coefficient (-)
+        return self._call(GetCDpay, opt_vars, AR, S)  # Payload drag coefficient (-)
 
     def drag_coefficient(self, opt_vars, AR, S):
-        return GetCD(self, opt_vars, AR, S)  # Total drag coefficient; breakdown
+        return self._call(GetCD, opt_vars, AR, S)  # Total drag coefficient; breakdown
 
     def max_camber(self):
-        return Getepsilon(self)  # Maximum wing camber (-)
+        return self._call(Getepsilon)  # Maximum wing camber (-)
 
     def wing_tip_deflection(self, opt_vars, AR, S):
-        return Getdb(self, opt_vars, AR, S)  # Wing tip deflection / wingspan
+        return self._call(Getdb, opt_vars, AR, S)  # Wing tip deflection / wingspan
 
     def required_thrust(self, opt_vars, AR, S):
-        return GetRequiredThrust(self, opt_vars, AR, S)  # Required thrust (N)
+        return self._call(GetRequiredThrust, opt_vars, AR, S)  # Required thrust (N)
 
     def maximum_thrust(self, V):
-        return GetMaxThrust(self, V)  # Maximum thrust (N)
+        return self._call(GetMaxThrust, V)  # Maximum thrust (N)
 
     def excess_thrust(self, opt_vars, AR, S):  # Maximum - required thrust (N)
-        return GetExcessThrust(self, opt_vars, AR, S)
+        return self._call(GetExcessThrust, opt_vars, AR, S)
 
     def wing_dimensions(self, AR, S):
-        return GetWingDimensions(self, AR, S)
+        return self._call(GetWingDimensions, AR, S)
 
     def turn_rate(self, opt_vars, AR, S):  # Turn rate (rad/s)
-        return GetOmega(self, opt_vars, AR, S)
+        return self._call(GetOmega, opt_vars, AR, S)
+
+    def evaluate(self, N, R, mpay, AR, S):  # All quantities, for array inputs
+        return GetEvaluation(self, N, R, mpay, AR, S)
+
+    def gradients(self, opt_vars, AR, S):  # d/d(N, R, mpay, AR, S) of mO3, etc.
+        return self._call(GetGradients, opt_vars, AR, S)
 
 
 if __name__ == "__main__":
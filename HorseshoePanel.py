@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Class for creating horseshoe vortex panels to be used in a vortex lattice method
+Classes for creating horseshoe vortex panels to be used in a vortex lattice 
+method. HorseshoePanelArray stores a whole mesh of panels as arrays; a 
+HorseshoePanel can be a single panel or a view over one row of such a mesh.
 
 Author: David Darmofal, MIT
 Date: April 2, 2021
@@ -19,6 +21,21 @@ class HorseshoePanel(object):
         self.agb  = agb
         self.al0a = al0a
         self.al0b = al0b
+    
+    @classmethod
+    def view(cls, XLEa, XLEb, ca, cb, aga, agb, al0a, al0b):
+        # Panel over the given arrays without copying them, e.g. a row of a 
+        # HorseshoePanelArray: changes to one show in the other
+        panel = cls.__new__(cls)
+        panel.XLEa = XLEa
+        panel.XLEb = XLEb
+        panel.ca   = ca
+        panel.cb   = cb
+        panel.aga  = aga
+        panel.agb  = agb
+        panel.al0a = al0a
+        panel.al0b = al0b
+        return panel
         
     def get_XLEa(self):
         return self.XLEa.copy()
@@ -114,6 +131,88 @@ class HorseshoePanel(object):
         unitVind = (Vax + Vbx)/(4*np.pi)
     
         return unitVind
+
+
+class HorseshoePanelArray(object):
+    """
+    Structure-of-arrays mesh of N horseshoe panels. XLEa, XLEb are (N,3) 
+    arrays of leading-edge points and ca, cb, aga, agb, al0a, al0b are (N,) 
+    arrays. The derived geometry (bound vortex endpoints, control points and 
+    normals) is computed once here, using the same formulas as HorseshoePanel.
+    The arrays are float64, or complex128 if any input is complex (for 
+    complex-step sensitivities, see UEFC_wing.sensitivities).
+    """
+    def __init__(self, XLEa, XLEb, ca, cb, aga, agb, al0a, al0b):
+        dtype = np.result_type(XLEa, XLEb, ca, cb, aga, agb, al0a, al0b, np.float64)
+        self.XLEa = np.ascontiguousarray(XLEa, dtype=dtype)
+        self.XLEb = np.ascontiguousarray(XLEb, dtype=dtype)
+        N = self.XLEa.shape[0]
+        self.ca   = np.broadcast_to(np.asarray(ca,   dtype=dtype), N).copy()
+        self.cb   = np.broadcast_to(np.asarray(cb,   dtype=dtype), N).copy()
+        self.aga  = np.broadcast_to(np.asarray(aga,  dtype=dtype), N).copy()
+        self.agb  = np.broadcast_to(np.asarray(agb,  dtype=dtype), N).copy()
+        self.al0a = np.broadcast_to(np.asarray(al0a, dtype=dtype), N).copy()
+        self.al0b = np.broadcast_to(np.asarray(al0b, dtype=dtype), N).copy()
+        
+        # Bound vortex endpoints (quarter chord)
+        self.Xbounda = self.XLEa.copy()
+        self.Xbounda[:,0] += 0.25*self.ca
+        self.Xboundb = self.XLEb.copy()
+        self.Xboundb[:,0] += 0.25*self.cb
+        
+        # Control points (three-quarter chord)
+        self.Xcontrol = 0.5*(self.XLEa+self.XLEb)
+        self.Xcontrol[:,0] += 0.375*(self.ca+self.cb)
+        
+        # Panel chord and span widths
+        self.c  = 0.5*(self.ca+self.cb)
+        self.dy = self.XLEb[:,1]-self.XLEa[:,1]
+        self.dz = self.XLEb[:,2]-self.XLEa[:,2]
+        self.ds = np.sqrt(self.dy**2 + self.dz**2)
+        
+        # Control point normals (small angle approximation)
+        ag  = 0.5*(self.aga + self.agb)
+        al0 = 0.5*(self.al0a + self.al0b)
+        self.ncontrol = np.empty((N,3), dtype=dtype)
+        self.ncontrol[:,0] = (ag-al0)*np.pi/180.
+        self.ncontrol[:,1] = -self.dz/self.ds
+        self.ncontrol[:,2] =  self.dy/self.ds
+    
+    def __len__(self):
+        return self.XLEa.shape[0]
+    
+    def __getitem__(self, i):
+        return HorseshoePanel.view(self.XLEa[i], self.XLEb[i], self.ca[i], 
+                                   self.cb[i], self.aga[i], self.agb[i], 
+                                   self.al0a[i], self.al0b[i])
+
+
+def calc_unitV(Xa, Xb, Xc, bound=True):
+    """
+    Vectorized version of HorseshoePanel.get_unitV (and get_unitVind when 
+    bound=False). Xa, Xb are (Np,3) arrays of bound vortex endpoints and Xc is 
+    an (Nc,3) array of evaluation points. Returns an (Nc,Np,3) array with the 
+    velocity induced at each point by each horseshoe of unit strength.
+    """
+    a = Xc[:,np.newaxis,:] - Xa[np.newaxis,:,:]
+    b = Xc[:,np.newaxis,:] - Xb[np.newaxis,:,:]
+    
+    amag = np.sqrt(np.sum(a*a, axis=-1))
+    bmag = np.sqrt(np.sum(b*b, axis=-1))
+    
+    # a x [1,0,0] = [0, a_z, -a_y]
+    fa = 1/((amag-a[...,0])*amag)
+    fb = 1/((bmag-b[...,0])*bmag)
+    V = np.zeros(a.shape, dtype=np.result_type(a, b))
+    V[...,1] = a[...,2]*fa - b[...,2]*fb
+    V[...,2] = b[...,1]*fb - a[...,1]*fa
+    
+    if bound:
+        fab = (1/amag + 1/bmag)/(amag*bmag + np.sum(a*b, axis=-1))
+        V += np.cross(a, b)*fab[...,np.newaxis]
+    
+    return V/(4*np.pi)
+
         
 if __name__ == "__main__":
     H = HorseshoePanel([0,-1,np.tan(10*np.pi/180)],[0,0,0],1,1,10,10,0,0)
@@ -1,30 +1,24 @@
-import json
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-import math
 
-def gen_graph(file, title):
-    with open(file) as f:
-        data = f.read()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from results_io import load_results, load_legacy_json, to_grid
 
-    js = json.loads(data)
-    lamb_dup = [js[k][0][3] for k in js]
-    tau_dup = np.array([js[k][0][2] for k in js])
-    tau = np.unique(tau_dup)
-    lamb  = np.unique(lamb_dup)
-    L, T = np.meshgrid(lamb, tau)
+def gen_graph(file, title):
+    # Columnar .npz results (parametric_study.save_study), or the JSON files
+    # of the original (tau, taper) sweeps
+    if file.endswith('.npz'):
+        columns = load_results(file)
+    else:
+        columns = load_legacy_json(file)
 
-    mO3 = np.ndarray((15,15))
-    for t in range(15):
-        ta = tau[t]
-        for l in range(15):
-            la = lamb[l]
-            for k in js:
-                if math.isclose(js[k][0][3],la) and math.isclose(js[k][0][2],ta):
-                    mO3[l][t] = float(k)
+    tau, lamb, mO3 = to_grid(columns, 'tau', 'taper', 'mO3')
+    T, L = np.meshgrid(tau, lamb, indexing='ij')
 
     _, ax = plt.subplots()
-    levels = np.linspace(np.min(mO3[mO3 > 0]), np.max(mO3), 21)
+    levels = np.linspace(np.nanmin(mO3[mO3 > 0]), np.nanmax(mO3), 21)
     cs = ax.contour(T, L, mO3, levels=levels, linewidths=0.5)
     plt.clabel(cs, inline=1, fontsize=12)
     ax.set_xlabel(r'$\tau$ ($\frac{t}{c}$)')
@@ -35,4 +29,4 @@ def gen_graph(file, title):
 gen_graph('Optimal_ARS_3.txt', r'$m_{\mathrm{pay}}\Omega^3$ $(\frac{\mathrm{g}}{\mathrm{s}^3})$ Contour Plot (Question 4)')
 gen_graph('Optimal_ARS_2.txt', r'$m_{\mathrm{pay}}\Omega^3$ $(\frac{\mathrm{g}}{\mathrm{s}^3})$ Contour Plot (Question 5)')
 gen_graph('Optimal_ARS_1.txt', r'$m_{\mathrm{pay}}\Omega^3$ $(\frac{\mathrm{g}}{\mathrm{s}^3})$ Contour Plot (Question 6)')
-plt.show()
\ No newline at end of file
+plt.show()
@@ -9,11 +9,52 @@ Date: April 2, 2021
 """
 
 import numpy as np
+import scipy.linalg
 import HorseshoePanel as HP
-import matplotlib.pyplot as plt
+
+# Geometry parameters of UEFC_wing (see sensitivities)
+GEOMETRY_PARAMS = ('b', 'croot', 'ctip', 'agroot', 'agtip', 'dihedral')
+
+# Zero-lift angle (degrees). This is a reasonable value for all UEFC airfoils
+AL0 = -6.0
+
+# Root incidence and twist, agroot - agtip (degrees), of the wings designed by
+# opt_m03_legit and tabulated by wing_surrogate
+AGROOT = 3.13
+TWIST = 5.0
+
+# Complex step size of sensitivities (as in GetGradients)
+H = 1e-30
+
+def panel_edges(eta, Nsemi):
+    # Panel edges eta = sin(phi) over the semi-span, from the root (0) to 
+    # the tip (1), at every station eta. Over the full span this is the 
+    # cosine spacing y = -(b/2) cos(theta), so phi is uniform for a single 
+    # segment; otherwise phi is uniform within each segment, with the Nsemi 
+    # panels shared between segments in proportion to their extent in phi 
+    # (at least one each).
+    phi  = np.arcsin(np.clip(eta, 0., 1.))
+    dphi = np.diff(phi)
+    if len(dphi) > Nsemi:
+        raise ValueError('Nsemi must be at least the number of segments')
+    
+    # Largest remainder apportionment of the panels
+    share = Nsemi*dphi/phi[-1]
+    n = np.maximum(np.floor(share).astype(int), 1)
+    while n.sum() < Nsemi:
+        n[np.argmax(share - n)] += 1
+    while n.sum() > Nsemi:
+        n[np.argmax(np.where(n > 1, n - share, -np.inf))] -= 1
+    
+    phi_edges = np.concatenate([phi[k] + dphi[k]*np.arange(n[k])/n[k] 
+                                for k in range(len(dphi))] + [phi[-1:]])
+    edges = np.sin(phi_edges)
+    edges[np.cumsum(np.concatenate([[0], n]))] = eta  # exactly on stations
+    
+    return edges
 
 class UEFC_wing(object):
-    def __init__(self, b=None, croot=None, ctip=None, agroot=None, agtip=None, dihedral=None):
+    def __init__(self, b=None, croot=None, ctip=None, agroot=None, agtip=None, dihedral=None, Nsemi=50, symmetric=True):
  
         self.b        = b
         self.croot    = croot
@@ -21,166 +62,336 @@ class UEFC_wing(object):
         self.agroot   = agroot
         self.agtip    = agtip
         self.dihedral = dihedral
+        self.Nsemi    = Nsemi # Panels per semi-span (see vlm_convergence)
+        
+        # Solve for the right half span only, with the mirror-image 
+        # horseshoes folded into the influence matrix (see calc_AIC). The 
+        # wing and inflow are symmetric, so this gives the full-span 
+        # solution at an eighth of the factorization cost.
+        self.symmetric = symmetric
+        
+        # Linear taper and twist: a single segment from root to tip
+        self.trapezoid = True
+        self.build_mesh(np.array([0., 0.5*b]), np.array([croot, ctip]), 
+                        np.array([agroot, agtip]), dihedral, AL0)
     
-        Nsemi = 50
+    @classmethod
+    def from_stations(cls, y, chord, twist, dihedral=0., al0=None, Nsemi=50, 
+                      symmetric=True):
+        # Wing defined by spanwise stations of the semi-span, root to tip: 
+        # y (from 0 to b/2), chord, twist (geometric incidence angle, 
+        # degrees) and zero-lift angle al0 (degrees, default AL0) at each 
+        # station, all linearly interpolated between stations, and the 
+        # dihedral angle (degrees) of each segment between stations (or one 
+        # angle for all of them), e.g. a constant chord centre section 
+        # followed by a tapered outboard section with polyhedral.
+        y     = np.asarray(y)
+        chord = np.asarray(chord)
+        twist = np.asarray(twist)
+        if al0 is None:
+            al0 = AL0
+        
+        wing = cls.__new__(cls)
+        wing.b        = 2*y[-1]
+        wing.croot    = chord[0]
+        wing.ctip     = chord[-1]
+        wing.agroot   = twist[0]
+        wing.agtip    = twist[-1]
+        wing.dihedral = dihedral
+        wing.Nsemi    = Nsemi
+        wing.symmetric = symmetric
+        wing.trapezoid = False
+        wing.build_mesh(y, chord, twist, dihedral, al0)
+        
+        return wing
+    
+    def build_mesh(self, y, chord, ag, dihedral, al0):
+        # Cosine-spaced panels from the spanwise stations (see from_stations), 
+        # generated for all panels at once. The stations are interpolated in 
+        # eta = |y|/(b/2), which stays real when the geometry is complex (see 
+        # sensitivities). Panel edges fall on every station (see 
+        # panel_edges), so kinks in chord, twist and dihedral are not smeared
+        # over a panel.
+        self.stations = {'y': y, 'chord': chord, 'twist': ag, 
+                         'dihedral': dihedral, 'al0': al0}
         
-        al0 = -6.0 # This is a reasonable value for all UEFC airfoils
         pi = np.pi
-        cmax = max(croot,ctip)
-        self.HPlist = []
-        for i in range(2*Nsemi):
-            tha = 0.5*i*pi/Nsemi
-            thb = tha + 0.5*pi/Nsemi
-            fa = -np.cos(tha)
-            fb = -np.cos(thb)
-            ya  = 0.5*b*fa
-            yb  = 0.5*b*fb
-            afa = np.abs(fa)
-            afb = np.abs(fb)
-            ca  = croot + (ctip-croot)*afa
-            cb  = croot + (ctip-croot)*afb
-            aga = agroot + (agtip-agroot)*afa
-            agb = agroot + (agtip-agroot)*afb
-            xa  = cmax-ca
-            xb  = cmax-cb
-            za  = 0.5*b*afa*np.tan(dihedral*pi/180)
-            zb  = 0.5*b*afb*np.tan(dihedral*pi/180)
-            Xa  = np.array([xa, ya, za])
-            Xb  = np.array([xb, yb, zb])
-            pan = HP.HorseshoePanel(Xa, Xb, ca, cb, aga, agb, al0, al0)
-            self.HPlist.append(pan)
+        Nsemi = self.Nsemi
+        eta = np.real(y/y[-1])
+        zst = np.concatenate([[0.], np.cumsum(np.diff(y)*np.tan(np.asarray(dihedral)*pi/180))])
+        al0 = np.broadcast_to(al0, np.shape(y))
         
+        cmax = np.max(np.real(chord)) # real: a shift in x has no effect
+        edges = panel_edges(eta, Nsemi)
+        edges = np.concatenate([-edges[:0:-1], edges])
+        fa = edges[:-1]
+        fb = edges[1:]
+        afa = np.abs(fa)
+        afb = np.abs(fb)
+        ca  = np.interp(afa, eta, chord)
+        cb  = np.interp(afb, eta, chord)
+        aga = np.interp(afa, eta, ag)
+        agb = np.interp(afb, eta, ag)
+        Xa  = np.stack([cmax-ca, y[-1]*fa, np.interp(afa, eta, zst)], axis=1)
+        Xb  = np.stack([cmax-cb, y[-1]*fb, np.interp(afb, eta, zst)], axis=1)
+        self.panels = HP.HorseshoePanelArray(Xa, Xb, ca, cb, aga, agb, 
+                                             np.interp(afa, eta, al0), 
+                                             np.interp(afb, eta, al0))
+        self.Kdrag  = self.calc_Kdrag()
+        self.LU     = None # LU factorization of the influence matrix (see get_LU)
+        self.basis  = None # Basis solutions at alpha = 0 and per radian (see get_basis)
+    
+    @property
+    def HPlist(self):
+        # List of HorseshoePanel views over the rows of self.panels
+        return [self.panels[i] for i in range(len(self.panels))]
     
     def plotgeom(self):
-        fig, axs = plt.subplots(3,1,sharex=True)
-        axs_p = axs[0] # planform plot
-        axs_f = axs[1] # front plot
-        axs_g = axs[2] # geometric twist
-    
-        for pan in self.HPlist:
-            XLEa = pan.get_XLEa()
-            XLEb = pan.get_XLEb()
-            ca   = pan.get_ca()
-            cb   = pan.get_cb()
-            aga  = pan.get_aga()
-            agb  = pan.get_agb()
-            
-            axs_p.plot([XLEa[1],XLEb[1],XLEb[1],XLEa[1],XLEa[1]],[XLEa[0],XLEb[0],XLEb[0]+cb,XLEa[0]+ca,XLEa[0]],color='black')
-            
-            axs_f.plot([XLEa[1],XLEb[1]],[XLEa[2],XLEb[2]],color='black')
-            
-            axs_g.plot([XLEa[1],XLEb[1]],[aga, agb],color='black')
-                
-        axs_p.axis('equal')
-        axs_p.set_ylabel('$x$')
-        axs_f.axis('equal')
-        axs_f.set_ylabel('$z$')
-        axs_g.set_ylabel(r'$\alpha_g$')
-        axs_g.set_xlabel('$y$')
-        axs_p.set_title('$S =$ {:.3f}, $AR =$ {:.2f}'.format(self.get_S(),self.get_AR()))
-        
-        return (fig, axs)
+        # Planform, front view and geometric twist (see plotting.plot_geometry)
+        import plotting
+        return plotting.plot_geometry(self)
         
     
     def get_S(self):
-        return 0.5*(self.croot+self.ctip)*self.b
+        y     = self.stations['y']
+        chord = self.stations['chord']
+        return np.sum((chord[1:]+chord[:-1])*np.diff(y))
     
     def get_AR(self):
         return (self.b**2)/self.get_S()
     
     def solve(self, alpha=None, CL=None):
         
+        # The system is linear in alpha (small angle approximation), so the 
+        # solution is G = G0 + alphar*Ga with the basis from get_basis
         pi = np.pi
+        basis = self.get_basis()
         if not (alpha is None):
-            alphar = alpha*pi/180.
             alphad = alpha
-            Vinf = np.array([1.0, 0., alphar]) # small angle approimation
-        elif (CL is None):
+            alphar = alpha*pi/180.
+        elif not (CL is None):
+            alphar = (CL-basis["CL0"])/basis["CLa"]
+            alphad = alphar*180./pi
+        else:
             print('Error: you must define alpha or CL')
         
-        N = len(self.HPlist)
-        A = np.zeros((N,N))
-        b = np.zeros(N)
-        for i in range(N):
-            pani = self.HPlist[i]
-            nci  = pani.get_ncontrol()
-            Xci  = pani.get_Xcontrol()
-            
-            for j in range(N):
-                panj = self.HPlist[j]
-                A[i,j] = panj.get_unitV(Xci) @ nci
+        G = basis["G0"] + alphar*basis["Ga"]
+        
+        return G, alphad
+    
+    
+    def solve_many(self, alphas=None, CLs=None):
+        # Batched version of solve. Returns the circulations as a (k,N) array 
+        # (one row per alpha or CL) and the k angles of attack in degrees. 
+        basis = self.get_basis()
+        
+        if not (alphas is None):
+            alphads = np.atleast_1d(np.asarray(alphas, dtype=np.float64))
+            alphars = alphads*np.pi/180.
         
+        elif not (CLs is None):
+            CLs = np.atleast_1d(np.asarray(CLs, dtype=np.float64))
+            alphars = (CLs-basis["CL0"])/basis["CLa"]
+            alphads = alphars*180./np.pi
+        
+        else:
+            raise ValueError('you must define alphas or CLs')
+        
+        G = basis["G0"] + alphars[:,np.newaxis]*basis["Ga"]
+        
+        return G, alphads
+    
+    
+    def aeroperf(self, alpha=None, CL=None):
+        # Closed-form equivalent of calc_aeroperf(solve(alpha=..., CL=...)[0])
+        # that only uses the basis quantities from get_basis: CL is linear in
+        # alpha, CDi is quadratic and clmax is the max of linear functions.
+        basis = self.get_basis()
         if not (alpha is None):
-            for i in range(N):
-                pani = self.HPlist[i]
-                nci  = pani.get_ncontrol()
-                Xci  = pani.get_Xcontrol()
-                b[i] = -np.matmul(Vinf,nci)
+            alphar = alpha*np.pi/180.
+        elif not (CL is None):
+            alphar = (CL-basis["CL0"])/basis["CLa"]
+        else:
+            raise ValueError('you must define alpha or CL')
+        
+        CL    = basis["CL0"] + alphar*basis["CLa"]
+        CDi   = basis["CDi0"] + alphar*(basis["CDi1"] + alphar*basis["CDi2"])
+        clmax = max(basis["cl0"] + alphar*basis["cla"])
+        e0    = CL**2/(np.pi*self.get_AR()*CDi)
+        
+        return CL, CDi, e0, clmax
+    
+    
+    def calc_CL_clmax(self, clmax):
+        # Wing CL at which the maximum sectional cl first reaches clmax. 
+        # Each section reaches clmax at alpha_i = (clmax-cl0_i)/cla_i, so the 
+        # first to do so sets the wing alpha.
+        basis = self.get_basis()
+        cla = basis["cla"]
+        up  = cla > 0
+        alphar = np.min((clmax-basis["cl0"][up])/cla[up])
+        
+        return basis["CL0"] + alphar*basis["CLa"]
+    
+    
+    def get_basis(self):
+        # Basis solutions G0 (Vinf=[1,0,0]) and Ga (Vinf=[0,0,1], i.e. dG per 
+        # radian of alpha), computed once per geometry with the cached LU, 
+        # along with their CL, cl distributions and induced drag coefficients
+        if self.basis is None:
+            nc = self.panels.ncontrol
+            Vinf = np.array([[1.0, 0.0, 0.0],
+                             [0.0, 0.0, 1.0]])
+            if self.symmetric:
+                # Right half solution, mirrored onto the left half
+                G0a = scipy.linalg.lu_solve(self.get_LU(), 
+                                            -nc[self.Nsemi:] @ Vinf.T)
+                G0a = np.concatenate([G0a[::-1], G0a])
+            else:
+                G0a = scipy.linalg.lu_solve(self.get_LU(), -nc @ Vinf.T)
+            G0  = G0a[:,0]
+            Ga  = G0a[:,1]
             
-            G = np.linalg.solve(A,b)
+            S = self.get_S()
+            K = self.Kdrag
+            cl0, y = self.calccldist(G0)
+            cla, y = self.calccldist(Ga)
+            self.basis = {
+                    "G0":   G0,
+                    "Ga":   Ga,
+                    "CL0":  2*(G0 @ self.panels.dy)/S,
+                    "CLa":  2*(Ga @ self.panels.dy)/S,
+                    "cl0":  cl0,
+                    "cla":  cla,
+                    "CDi0": 2*(G0 @ K @ G0)/S,
+                    "CDi1": 2*(G0 @ K @ Ga + Ga @ K @ G0)/S,
+                    "CDi2": 2*(Ga @ K @ Ga)/S,
+                    }
+        return self.basis
+    
+    
+    def sensitivities(self, alpha=None, CL=None, params=GEOMETRY_PARAMS):
+        # Derivatives of CL, CDi, e0 and clmax with respect to the geometry 
+        # parameters params, at fixed alpha (degrees) or at fixed CL. 
+        # Returns a dict of dicts, e.g. sens['CDi']['agtip'].
+        #
+        # Direct method: for each parameter x, A dG/dx = db/dx - dA/dx G 
+        # is solved with the cached LU factorization of A. dA/dx and db/dx 
+        # come exactly from a complex-step assembly of the wing at x + iH, 
+        # and the outputs are differentiated the same way, so the cost per 
+        # parameter is one complex assembly plus one back-substitution.
+        # Only for wings built from the six parameters (not from_stations).
+        if alpha is None and CL is None:
+            raise ValueError('you must define alpha or CL')
+        if not self.trapezoid:
+            raise ValueError('sensitivities are only available for wings '
+                             'defined by the GEOMETRY_PARAMS')
         
-        else:
-            Vinf = np.array([1.0, 0.0, 0.0])
-            for i in range(N):
-                pani = self.HPlist[i]
-                nci  = pani.get_ncontrol()
-                Xci  = pani.get_Xcontrol()
-                b[i] = -np.matmul(Vinf,nci)           
-                
-            G0 = np.linalg.solve(A,b)
-            CL0, CD0, e0, clmax0 = self.calc_aeroperf(G0)
+        basis = self.get_basis()
+        LU    = self.get_LU()
+        Vinf  = np.array([[1.0, 0.0, 0.0],
+                          [0.0, 0.0, 1.0]])
+        G0a   = np.stack([basis["G0"], basis["Ga"]], axis=1)
+        half  = slice(self.Nsemi, None) if self.symmetric else slice(None)
+        
+        geometry = {name: getattr(self, name) for name in GEOMETRY_PARAMS}
+        sens = {name: {} for name in ('CL', 'CDi', 'e0', 'clmax')}
+        for param in params:
+            geometry_c = dict(geometry)
+            geometry_c[param] = geometry[param] + 1j*H
+            wing_c = UEFC_wing(Nsemi=self.Nsemi, symmetric=self.symmetric, 
+                               **geometry_c)
             
-            Vinf = np.array([1.0, 0.0, 0.1])
-            for i in range(N):
-                pani = self.HPlist[i]
-                nci  = pani.get_ncontrol()
-                Xci  = pani.get_Xcontrol()
-                b[i] = -np.matmul(Vinf,nci) 
-                
-            G1 = np.linalg.solve(A,b)
-            CL1, CD1, e1, clmax1 = self.calc_aeroperf(G1)
-
-            G = G0 + (CL-CL0)/(CL1-CL0)*(G1-G0)
-            alphad = 0.1*180./pi*(CL-CL0)/(CL1-CL0)
+            # Derivatives of the basis solutions
+            dA   = np.imag(wing_c.calc_AIC())/H
+            drhs = np.imag(-wing_c.panels.ncontrol[half] @ Vinf.T)/H
+            dG0a = scipy.linalg.lu_solve(LU, drhs - dA @ G0a[half])
+            if self.symmetric:
+                dG0a = np.concatenate([dG0a[::-1], dG0a])
+            G0, Ga = (G0a + 1j*H*dG0a).T
+            
+            # Outputs of the perturbed wing with the perturbed solution
+            pans = wing_c.panels
+            S    = wing_c.get_S()
+            if alpha is not None:
+                alphar = alpha*np.pi/180.
+            else:
+                CL0    = 2*(G0 @ pans.dy)/S
+                CLa    = 2*(Ga @ pans.dy)/S
+                alphar = (CL-CL0)/CLa
+            G = G0 + alphar*Ga
+            
+            CLc  = 2*(G @ pans.dy)/S
+            CDic = 2*(G @ wing_c.Kdrag @ G)/S
+            e0c  = CLc**2/(np.pi*wing_c.get_AR()*CDic)
+            cl   = 2*G/pans.c
+            
+            sens['CL'][param]    = np.imag(CLc)/H
+            sens['CDi'][param]   = np.imag(CDic)/H
+            sens['e0'][param]    = np.imag(e0c)/H
+            sens['clmax'][param] = np.imag(cl[np.argmax(np.real(cl))])/H
         
-        return G, alphad
+        return sens
+    
+    
+    def calc_AIC(self):
+        # Influence matrix: A[i,j] = (velocity induced at control point i by 
+        # horseshoe j of unit strength).n_i
+        # When symmetric, only the rows of the right half control points 
+        # (panels Nsemi...2*Nsemi-1) are built, and the column of each left 
+        # half panel is added to that of its mirror image, panel 
+        # 2*Nsemi-1-j, which carries the same circulation.
+        pans = self.panels
+        if self.symmetric:
+            Nsemi = self.Nsemi
+            V = HP.calc_unitV(pans.Xbounda, pans.Xboundb, pans.Xcontrol[Nsemi:])
+            A = np.einsum('ijk,ik->ij', V, pans.ncontrol[Nsemi:])
+            return A[:,Nsemi:] + A[:,Nsemi-1::-1]
+        
+        V = HP.calc_unitV(pans.Xbounda, pans.Xboundb, pans.Xcontrol)
+        return np.einsum('ijk,ik->ij', V, pans.ncontrol)
+    
+    
+    def get_LU(self):
+        # A depends only on the geometry, so it is factorized once at first 
+        # use and reused for every subsequent solve
+        if self.LU is None:
+            self.LU = scipy.linalg.lu_factor(self.calc_AIC())
+        return self.LU
     
     
     def plotcl(self, G, plotclccbar=False):
+        # Spanwise cl distribution of the solution G (see plotting.plot_cl)
+        import plotting
+        return plotting.plot_cl(self, G, plotclccbar)
     
-        cl, y = self.calccldist(G)
-        fig, axs = plt.subplots(1,1,sharex=True)
-        axs.plot(2*y/self.b,cl,'r-',label='$c_l$')
-        if plotclccbar:
-            cbar = 0.5*(self.croot + self.ctip)
-            clccbar = 2*G/cbar
-            axs.plot(2*y/self.b,clccbar,'b-',label='$c_l\, c/\overline{c}$')
+    
+    def calc_Kdrag(self):
+        # Trefftz-plane induced drag matrix K such that Di = G^T K G. The 
+        # trailing vortex j (strength dG_j) leaves the wing at Xbounda[j] 
+        # (Xboundb[N-1] for j = N) and induces the normal velocity Vn_i at 
+        # control point i. With dG = D G this gives 
+        #   Di = -0.5 sum_i Vn_i G_i ds_i = G^T K G
+        pans = self.panels
+        N = len(pans)
+        Xj = np.vstack([pans.Xbounda, pans.Xboundb[-1]])
         
-        clmax = max(cl)
-        CL, CDi, e0, clmax0 = self.calc_aeroperf(G)
-        axs.set_title('$C_L =$ {:.2f}, $max(c_l) =$ {:.2f}, $CDi =$ {:.4f}, $e_0 =$ {:.2f}'.format(CL,clmax,CDi,e0))
-        axs.set_xlabel('$y/(b/2)$')
-        axs.grid(True)
-        axs.legend()
+        dyij = pans.Xcontrol[:,np.newaxis,1] - Xj[np.newaxis,:,1]
+        dzij = pans.Xcontrol[:,np.newaxis,2] - Xj[np.newaxis,:,2]
+        dij2 = dyij**2 + dzij**2
         
-        return (fig, axs)
+        # Vn_i*ds_i per unit dG_j (ny = -dz/ds, nz = dy/ds)
+        F = -(dzij*pans.dz[:,np.newaxis] + dyij*pans.dy[:,np.newaxis])/dij2/(2*np.pi)
+        
+        D = np.eye(N+1, N) - np.eye(N+1, N, k=-1)
+        
+        return -0.5*(F @ D)
     
     
     def calccldist(self, G):
-        N = len(self.HPlist)
-        y = np.zeros(N)
-        c = np.zeros(N)
-        for i in range(N):
-            pan = self.HPlist[i]
-            XLEa = pan.get_XLEa()
-            XLEb = pan.get_XLEb()
-            ca   = pan.get_ca()
-            cb   = pan.get_cb()
-            
-            y[i] = 0.5*(XLEa[1] + XLEb[1])
-            c[i] = 0.5*(ca+cb)
-        
-        cl = 2*G/c
+        pans = self.panels
+        y  = 0.5*(pans.XLEa[:,1] + pans.XLEb[:,1])
+        cl = 2*G/pans.c
         
         return cl, y
     
@@ -192,60 +403,16 @@ class UEFC_wing(object):
         clmax = max(cl)
         
         # Calculate lift
-        N = len(self.HPlist)
-        L = 0
-        for i in range(N):
-            pan = self.HPlist[i]
-            Xa = pan.get_Xbounda()
-            Xb = pan.get_Xboundb()
-            dy = Xb[1]-Xa[1]
-            L = L + G[i]*dy
+        L = G @ self.panels.dy
 
         # Calculate induced drag
-        Di = 0.
-        for j in range(N+1):
-            if (j==0):
-                dG = G[0]
-            elif (j==N):
-                dG = -G[-1]
-            else:
-                dG = G[j]-G[j-1]
-            
-            if (j==N):
-                Xj = self.HPlist[N-1].get_Xboundb()
-            else:
-                Xj = self.HPlist[j].get_Xbounda()
-                
-            yj = Xj[1]
-            zj = Xj[2]
-            
-            pi = np.pi
-            for i in range(N):
-                pan = self.HPlist[i]
-                Xa = pan.get_Xbounda()
-                Xb = pan.get_Xboundb()
-                dy = Xb[1]-Xa[1]
-                dz = Xb[2]-Xa[2]
-                ds = np.sqrt(dy**2 + dz**2)
-                ny = -dz/ds
-                nz =  dy/ds
-                Xci = pan.get_Xcontrol()
-                yi = Xci[1]
-                zi = Xci[2]
-                dyij = yi - yj
-                dzij = zi - zj
-                dij2 = dyij**2 + dzij**2
-                Vn = dG/(2*pi)*(dzij*ny - dyij*nz)/dij2                
-                Di = Di + Vn*G[i]*ds
-                
-                
-        Di = -0.5*Di
+        Di = G @ self.Kdrag @ G
             
         S = self.get_S()    
         CL = 2*L/S
         CDi = 2*Di/S
         
-        e0 = CL**2/(pi*self.get_AR()*CDi)
+        e0 = CL**2/(np.pi*self.get_AR()*CDi)
         return CL, CDi, e0, clmax
             
     
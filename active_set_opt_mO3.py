@@ -0,0 +1,441 @@
+# Active-set solver of the fixed-(AR, S) mO3 problem of opt_mO3. The payload
+# is eliminated as the largest one allowed by the lift coefficient, tip
+# deflection and thrust relations (and its bounds), which leaves a search over
+# the load factor N and the speed V. Vectorized over (AR, S), so a whole
+# scan_ARS grid is solved at once, and it reports which constraints are
+# binding at each optimum.
+
+import numpy as np
+
+from opt_mO3 import BOUNDS
+
+# Settings of the active-set solver
+NGRID   = 129    # Load factors sampled over the bounds of N
+NZOOM   = 17     # Load factors sampled in each refinement of the best one
+N_TOL   = 1e-10  # Tolerance of the optimal N
+V_TOL   = 1e-13  # Relative tolerance of the thrust-limited speed
+W_TOL   = 1e-13  # Relative tolerance of the thrust-limited payload
+MAX_RF  = 100    # Iterations of the thrust root finding
+NSIDE   = 17     # Speeds sampled on each side of the best one for thrust roots
+
+# Settings of the search over (N, V) with a thrust-limited payload
+NGRID_T = (65, 17)  # Load factors and speeds sampled over their bounds
+NZOOM_T = 7         # Load factors (and speeds) sampled across the search box
+T_TOL   = 1e-6      # Tolerance of the optimal log(N - 1) and speed fraction
+MAX_T   = 200       # Iterations of the search
+
+
+def active_set_opt_mO3(UEFC, AR, S):
+
+    # Vectorized alternative to opt_mO3 for many (AR, S) cases at once,
+    # that exploits the structure of the problem instead of calling SLSQP.
+    # AR and S may be broadcastable arrays of any shape.
+    #
+    # The problem is parameterized by (N, V, mpay), with R = V^2/(g
+    # sqrt(N^2-1)) (GetV) and Omega = g sqrt(N^2-1)/V. For given (N, V)
+    # the objective increases with mpay, so mpay is at the smallest of its
+    # caps: the lift coefficient limit (GetCL: N W = CLdes q S, linear in
+    # Wpay), the tip deflection limit (Getdb: d/b is proportional to
+    # N (Wfuse + Wpay)), its upper bound and the thrust limit (the payload
+    # at which the excess thrust is zero). Two candidates are found for each
+    # case and the better one is kept:
+    #   - The payload at the CL, d/b or mpay cap (see reduced_objective).
+    #     Along that cap the best speed is known in closed form, or is the
+    #     speed at which the excess thrust is zero, so what remains is a 1D
+    #     maximization over N: a geometric sample refined around its best
+    #     point. These are the optima where thrust does not bind, or binds
+    #     together with one of the other caps (e.g. "T+CL").
+    #   - The payload at the smallest of all four caps (see
+    #     thrust_objective), maximized over (N, V) by a 2D sample followed
+    #     by a pattern search (see pattern_search). This finds the optima
+    #     where thrust is the only payload cap that binds (e.g. "T", "T+R").
+    #
+    # Returns opt_vars (shape + (3,)), mO3, success and binding arrays,
+    # where binding lists the active constraints and bounds at the optimum
+    # (e.g. "T+CL", "db+CL", "T+CL+R", "T"); success is False where no
+    # design was found to be feasible.
+    AR, S = np.broadcast_arrays(np.asarray(AR, dtype=np.float64),
+                                np.asarray(S,  dtype=np.float64))
+    shape = AR.shape
+    AR = AR.ravel()[:,np.newaxis]
+    S  = S.ravel()[:,np.newaxis]
+
+    (Nmin, Nmax), (Rmin, Rmax), (mpay_min, mpay_max) = BOUNDS
+
+    # Coarse sample of N for each case, geometric in N - 1: near N = 1 the
+    # feasible range of N can be narrow
+    Ngrid = 1 + np.geomspace(Nmin - 1, Nmax - 1, NGRID)
+    Ngrid = Ngrid[np.newaxis,:]*np.ones_like(AR)
+    F, design = reduced_objective(UEFC, Ngrid, AR, S)
+    best = np.argmax(F, axis=1)[:,np.newaxis]
+
+    # Zoom in on the best sample: resample the interval between its
+    # neighbours until it is shorter than N_TOL. Unlike a golden section
+    # search, this copes with F = -inf over part of the interval (narrow
+    # feasible ranges of N) and with kinks where the active set changes.
+    a = np.take_along_axis(Ngrid, np.maximum(best-1, 0), axis=1)
+    b = np.take_along_axis(Ngrid, np.minimum(best+1, NGRID-1), axis=1)
+    N = np.take_along_axis(Ngrid, best, axis=1)
+    Fbest = np.take_along_axis(F, best, axis=1)
+    while np.any(b - a > N_TOL):
+        Nzoom = a + (b - a)*np.linspace(0, 1, NZOOM)
+        Fzoom = reduced_objective(UEFC, Nzoom, AR, S)[0]
+        k = np.argmax(Fzoom, axis=1)[:,np.newaxis]
+        Fk = np.take_along_axis(Fzoom, k, axis=1)
+
+        # Keep the best point so far at the centre of the next interval
+        better = Fk > Fbest
+        N = np.where(better, np.take_along_axis(Nzoom, k, axis=1), N)
+        Fbest = np.where(better, Fk, Fbest)
+        h = (b - a)/(NZOOM - 1)
+        a, b = np.maximum(N - h, a), np.minimum(N + h, b)
+
+    F, design = reduced_objective(UEFC, N, AR, S)
+    F = F[:,0]
+    design = [x[:,0] for x in design]
+
+    # Thrust-limited payload: keep it where it does better
+    F_T, design_T = thrust_search(UEFC, AR[:,0], S[:,0])
+    use_T  = F_T > F
+    F      = np.where(use_T, F_T, F)
+    design = [np.where(use_T, x_T, x) for x_T, x in zip(design_T, design)]
+
+    success = np.isfinite(F)
+    N, R, mpay, binding = design
+    opt_vars = np.stack([N, R, mpay], axis=-1)
+    opt_vars[~success] = 0.
+    mO3 = np.where(success, F, 0.)
+    binding = np.where(success, binding, "")
+
+    return opt_vars.reshape(shape + (3,)), mO3.reshape(shape), \
+           success.reshape(shape), binding.reshape(shape)
+
+
+def thrust_search(UEFC, AR, S):
+
+    # Maximum of thrust_objective over (N, V) for each of the cases AR, S
+    # (1D arrays), by pattern_search. Returns F (-inf where no sample is
+    # feasible) and the design (N, R, mpay, binding), as reduced_objective.
+    F, N, u = pattern_search(lambda N, u, AR, S:
+                             thrust_objective(UEFC, N, u, AR, S)[0], AR, S)
+
+    rows = np.flatnonzero(np.isfinite(F))
+    design = [np.zeros(len(AR)), np.zeros(len(AR)), np.zeros(len(AR)),
+              np.full(len(AR), "", dtype="<U16")]
+    if len(rows):
+        F[rows], design_r = thrust_objective(UEFC, N[rows], u[rows], AR[rows],
+                                             S[rows])
+        for x, x_r in zip(design, design_r):
+            x[rows] = x_r
+
+    return F, design
+
+
+def feasibility_margin(UEFC, AR, S):
+
+    # Largest feasibility margin over (N, V): the smallest of the excess
+    # thrust at the payload lower bound and of the (relative) room left by
+    # the CL, d/b and R limits for the speed range and the payload. The
+    # lift coefficient, tip deflection and required thrust all increase
+    # with the payload, so the fixed-(AR, S) problem has a feasible design
+    # where the margin is >= 0. Unlike a -inf outside the limits, the
+    # margin leads the search into narrow feasible ranges of N. AR and S
+    # may be broadcastable arrays of any shape.
+    AR, S = np.broadcast_arrays(np.asarray(AR, dtype=np.float64),
+                                np.asarray(S,  dtype=np.float64))
+    mpay_min = BOUNDS[2][0]
+
+    def margin(N, u, AR, S):
+        N, u, AR, S = np.broadcast_arrays(N, u, AR, S)
+        limits = operating_limits(UEFC, N, AR, S)
+        V_low, V_up = limits["V_low"], limits["V_up"]
+        V = V_low + u*(V_up - V_low)
+        R = V**2/(UEFC.g*limits["sqN2"])
+        T = UEFC.excess_thrust((N, R, np.full(N.shape, mpay_min)), AR, S)
+        return np.minimum.reduce([T, (V_up - V_low)/V_up,
+                                  (limits["Wpay_max"] - limits["Wpay_min"])
+                                  /limits["W0"]])
+
+    return pattern_search(margin, AR.ravel(), S.ravel())[0].reshape(AR.shape)
+
+
+def pattern_search(objective, AR, S):
+
+    # Maximum of objective(N, u, AR, S) over the bounds of N and the
+    # fraction u in [0, 1] of the speed range, for each of the cases AR, S
+    # (1D arrays): a sample of z = log(N - 1) and u, followed by a pattern
+    # search around its best point. The optima lie on narrow curved ridges
+    # in (z, u), so the search box is only shrunk once its centre is the
+    # best point in it, and otherwise moves along to the better point.
+    # Returns the maximum (-inf where no sample is finite) and the N and u
+    # that attain it.
+    (Nmin, Nmax), (Rmin, Rmax), (mpay_min, mpay_max) = BOUNDS
+    nN, nu = NGRID_T
+    zmin, zmax = np.log(Nmin - 1), np.log(Nmax - 1)
+
+    zgrid = np.linspace(zmin, zmax, nN)
+    ugrid = np.linspace(0, 1, nu)
+    zmesh, umesh = (x.ravel()[np.newaxis,:] for x in
+                    np.meshgrid(zgrid, ugrid, indexing="ij"))
+    F = objective(1 + np.exp(zmesh), umesh, AR[:,np.newaxis], S[:,np.newaxis])
+    best = np.argmax(F, axis=1)
+    Fbest = F[np.arange(len(F)),best]
+    kz, ku = np.unravel_index(best, (nN, nu))
+    z, u = zgrid[kz], ugrid[ku]
+
+    # Search only the cases with a finite sample, starting from boxes of the
+    # sample spacing
+    hz = np.where(np.isfinite(Fbest), (zmax - zmin)/(nN - 1), 0.)
+    hu = np.where(np.isfinite(Fbest), 1/(nu - 1), 0.)
+
+    t = np.linspace(-1, 1, NZOOM_T)
+    shrink = (NZOOM_T - 1)/2
+    tz, tu = (x.ravel()[np.newaxis,:] for x in np.meshgrid(t, t, indexing="ij"))
+    for iteration in range(MAX_T):
+        active = np.flatnonzero((hz > T_TOL) | (hu > T_TOL))
+        if not len(active):
+            break
+        zbox = np.clip(z[active,np.newaxis] + hz[active,np.newaxis]*tz,
+                       zmin, zmax)
+        ubox = np.clip(u[active,np.newaxis] + hu[active,np.newaxis]*tu, 0, 1)
+        Fbox = objective(1 + np.exp(zbox), ubox, AR[active,np.newaxis],
+                         S[active,np.newaxis])
+        k = np.argmax(Fbox, axis=1)
+        Fk = Fbox[np.arange(len(active)),k]
+
+        # Move to a better point, or shrink the box around the centre to the
+        # sample spacing
+        better = Fk > Fbest[active]
+        z[active]     = np.where(better, zbox[np.arange(len(active)),k],
+                                 z[active])
+        u[active]     = np.where(better, ubox[np.arange(len(active)),k],
+                                 u[active])
+        Fbest[active] = np.where(better, Fk, Fbest[active])
+        hz[active]    = np.where(better, hz[active], hz[active]/shrink)
+        hu[active]    = np.where(better, hu[active], hu[active]/shrink)
+
+    return Fbest, 1 + np.exp(z), u
+
+
+def operating_limits(UEFC, N, AR, S):
+
+    # Payload weight caps and speed range at load factors N (see
+    # active_set_opt_mO3). The CL cap is Wpay = a V^2 - W0.
+    (Nmin, Nmax), (Rmin, Rmax), (mpay_min, mpay_max) = BOUNDS
+    g   = UEFC.g
+    rho = UEFC.rho
+
+    sqN2  = np.sqrt(N**2 - 1)
+    Wfuse = UEFC.fuselage_weight(AR, S)
+    W0    = Wfuse + UEFC.wing_weight(AR, S)
+    a     = UEFC.CLdes*0.5*rho*S/N
+
+    db_per_load = UEFC.wing_tip_deflection((np.ones_like(N), np.ones_like(N),
+                                            np.zeros_like(N)), AR, S)/Wfuse
+    Wpay_db  = UEFC.dbmax/(db_per_load*N) - Wfuse
+    Wpay_max = np.minimum(Wpay_db, g*mpay_max/1000)
+    Wpay_min = g*mpay_min/1000
+
+    # Speed range: R bounds and mpay lower bound
+    V_low = np.maximum(np.sqrt(Rmin*g*sqN2), np.sqrt((Wpay_min + W0)/a))
+    V_up  = np.sqrt(Rmax*g*sqN2)
+
+    return {"sqN2": sqN2, "W0": W0, "a": a, "Wpay_db": Wpay_db,
+            "Wpay_max": Wpay_max, "Wpay_min": Wpay_min, "V_low": V_low,
+            "V_up": V_up}
+
+
+def bracketed_root(f, x0, f0, x1, f1, rtol):
+
+    # Illinois (regula falsi) iterations on brackets [x0, x1] (either
+    # order) with f(x0) >= 0 > f(x1). Returns the end of the final bracket
+    # where f >= 0, so the result is always on the feasible side.
+    for iteration in range(MAX_RF):
+        if np.all((np.abs(x1 - x0) <= rtol*np.abs(x1)) | (f1 == 0)):
+            break
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x2 = x1 - f1*(x1 - x0)/(f1 - f0)
+        x2 = np.where(np.isfinite(x2), x2, 0.5*(x0 + x1))
+        f2 = f(x2)
+
+        # Keep the root bracketed between x0 and x1
+        same = np.sign(f2) == np.sign(f1)
+        x0 = np.where(same, x0, x1)
+        f0 = np.where(same, 0.5*f0, f1)
+        x1, f1 = x2, f2
+
+    return np.where(f1 >= 0, x1, x0)
+
+
+def binding_labels(thrust_limited, Wpay, V, limits, V_CL):
+
+    # Active constraints and bounds, e.g. "T+CL+R", of designs with payload
+    # weight Wpay at speed V; V_CL is the speed at which Wpay is at the CL
+    # cap
+    rtol = 1e-9
+    mpay_max = BOUNDS[2][1]
+    binding = np.full(np.shape(V), "", dtype="<U16")
+    for name, active in (("T",    thrust_limited),
+                         ("db",   Wpay >= limits["Wpay_db"]*(1 - rtol)),
+                         ("CL",   V <= V_CL*(1 + rtol)),
+                         ("R",    V >= limits["V_up"]*(1 - rtol)),
+                         ("mpay", (Wpay >= limits["Wpay_max"]*(1 - rtol)) &
+                                  (limits["Wpay_max"] < limits["Wpay_db"]))):
+        binding = np.char.add(binding, np.where(active, "+" + name, ""))
+    return np.char.lstrip(binding, "+")
+
+
+def reduced_objective(UEFC, N, AR, S):
+
+    # Maximum of mO3 over V for the given load factors N, with the payload
+    # at the smallest of its CL, d/b and mpay bound caps (see
+    # active_set_opt_mO3), -inf where infeasible. Returns it together with
+    # the design (N, R, mpay, binding) that attains it. All arguments are
+    # broadcastable arrays.
+    g = UEFC.g
+    N, AR, S = np.broadcast_arrays(N, AR, S)
+    limits = operating_limits(UEFC, N, AR, S)
+    sqN2, W0, a = limits["sqN2"], limits["W0"], limits["a"]
+    Wpay_max, V_low, V_up = limits["Wpay_max"], limits["V_low"], limits["V_up"]
+
+    # Best speed along the payload cap, then the thrust limit
+    V_stat = np.sqrt(3*W0/a)
+    V_kink = np.sqrt((Wpay_max + W0)/a)
+    V = np.clip(np.minimum(V_stat, V_kink), V_low, V_up)
+
+    def excess_thrust(V, sel=Ellipsis):
+        Wpay = np.minimum(a[sel]*V**2 - W0[sel], Wpay_max[sel])
+        R    = V**2/(g*sqN2[sel])
+        return UEFC.excess_thrust((N[sel], R, 1000*Wpay/g), AR[sel], S[sel])
+
+    T = excess_thrust(V)
+    thrust_limited = T < 0
+    feasible = (V_low <= V_up) & (Wpay_max >= limits["Wpay_min"])
+    if np.any(thrust_limited):
+
+        # The objective decreases away from V along the cap, so the best
+        # feasible speed is the zero excess thrust speed closest to V: on
+        # [V_low, V] or on [V, V_up]. The excess thrust need not be monotonic
+        # in V (e.g. feasible only on an interval strictly inside (V, V_up)),
+        # so each side is sampled outwards from V and the root is bracketed
+        # by the first feasible sample and the one before it.
+        def objective(V, sel):
+            return np.minimum(a[sel]*V**2 - W0[sel], Wpay_max[sel]) \
+                   *(sqN2[sel]/V)**3
+
+        limited = thrust_limited & feasible
+        sel = np.unravel_index(np.flatnonzero(limited), V.shape)
+        t = np.linspace(0, 1, NSIDE)[1:]
+        V_root = np.full(V[sel].shape, np.nan)
+        for V_end in (V_low, V_up):
+            V_s = V[sel][:,np.newaxis] + (V_end - V)[sel][:,np.newaxis]*t
+            V_s = np.concatenate([V[sel][:,np.newaxis], V_s], axis=1)
+            T_s = excess_thrust(V_s[:,1:], tuple(x[:,np.newaxis] for x in sel))
+            T_s = np.concatenate([T[sel][:,np.newaxis], T_s], axis=1)
+            k = np.argmax(T_s >= 0, axis=1)
+            found = k > 0
+            k1 = np.where(found, k - 1, 0)  # unbracketed: zero-width bracket
+            rows = np.arange(len(k))
+            V_side = bracketed_root(lambda Vs: excess_thrust(Vs, sel),
+                                    V_s[rows,k], T_s[rows,k],
+                                    V_s[rows,k1], T_s[rows,k1], V_TOL)
+            better = found & ~(objective(V_side, sel) <=
+                               objective(V_root, sel))
+            V_root = np.where(better, V_side, V_root)
+
+        V[sel] = np.where(np.isnan(V_root), V[sel], V_root)
+        feasible[sel] = ~np.isnan(V_root)
+
+    Wpay = np.minimum(a*V**2 - W0, Wpay_max)
+    mpay = 1000*Wpay/g
+    R    = V**2/(g*sqN2)
+    F    = np.where(feasible, mpay*(g*sqN2/V)**3, -np.inf)
+    binding = binding_labels(thrust_limited, Wpay, V, limits,
+                             np.sqrt((Wpay + W0)/a))
+
+    return F, (N, R, mpay, binding)
+
+
+def thrust_objective(UEFC, N, u, AR, S):
+
+    # mO3 at load factors N and speeds V = V_low + u (V_up - V_low), with
+    # the payload at the smallest of its CL, d/b, mpay bound and thrust caps
+    # (see active_set_opt_mO3), -inf where infeasible. Returns it together
+    # with the design (N, R, mpay, binding). All arguments are broadcastable
+    # arrays.
+    g = UEFC.g
+    N, u, AR, S = np.broadcast_arrays(N, u, AR, S)
+    limits = operating_limits(UEFC, N, AR, S)
+    sqN2, W0, a = limits["sqN2"], limits["W0"], limits["a"]
+    V_low, V_up = limits["V_low"], limits["V_up"]
+
+    V = V_low + u*(V_up - V_low)
+    R = V**2/(g*sqN2)
+    W_cap = np.minimum(a*V**2 - W0, limits["Wpay_max"])
+    W_min = np.full(V.shape, limits["Wpay_min"])
+
+    def excess_thrust(Wpay, sel=Ellipsis):
+        return UEFC.excess_thrust((N[sel], R[sel], 1000*Wpay/g), AR[sel],
+                                  S[sel])
+
+    # Payload of zero excess thrust on [W_min, W_cap] where the other caps
+    # leave a negative excess thrust
+    T = excess_thrust(W_cap)
+    thrust_limited = T < 0
+    feasible = (V_low <= V_up) & (W_cap >= W_min)
+    Wpay = W_cap.copy()
+    if np.any(thrust_limited):
+        T_min = excess_thrust(W_min)
+        feasible &= ~thrust_limited | (T_min >= 0)
+
+        sel = np.unravel_index(np.flatnonzero(thrust_limited & feasible),
+                               V.shape)
+        Wpay[sel] = bracketed_root(lambda W: excess_thrust(W, sel),
+                                   W_min[sel], T_min[sel], W_cap[sel], T[sel],
+                                   W_TOL)
+
+    mpay = 1000*Wpay/g
+    F    = np.where(feasible, mpay*(g*sqN2/V)**3, -np.inf)
+    binding = binding_labels(thrust_limited, Wpay, V, limits,
+                             np.sqrt((Wpay + W0)/a))
+
+    return F, (N, R, mpay, binding)
+
+
+if __name__ == "__main__":
+
+    import time
+    from GetUEFC import UEFC
+    from opt_mO3 import opt_mO3
+
+    # Compare with opt_mO3 over the grid of scan_ARS, for the default
+    # aircraft (where CL binds at every optimum) and for one with a higher
+    # CLdes (where thrust alone limits the payload at many optima)
+    AR, S = np.meshgrid(np.linspace(5, 15, 21), np.linspace(0.1, 0.7, 21),
+                        indexing="ij")
+    for parameters in ({}, {"CLdes": 1.5}):
+        aircraft = UEFC(**parameters)
+        print("UEFC(%s)" % ", ".join("%s=%g" % item
+                                     for item in parameters.items()))
+
+        start = time.time()
+        opt_vars, mO3, success, binding = active_set_opt_mO3(aircraft, AR, S)
+        print("active set: %0.2f s" % (time.time() - start))
+
+        start = time.time()
+        reference = np.array([opt_mO3(aircraft, ARi, Si)[1:]
+                              for ARi, Si in zip(AR.ravel(), S.ravel())])
+        print("opt_mO3:    %0.2f s" % (time.time() - start))
+
+        mO3_ref = reference[:,0].reshape(AR.shape)
+        both    = success & reference[:,1].reshape(AR.shape).astype(bool)
+        print("feasible cases: %d (opt_mO3: %d)" % (success.sum(),
+                                                    reference[:,1].sum()))
+        print("max relative difference in mO3: %0.1e"
+              % np.max(np.abs(mO3 - mO3_ref)[both]/mO3_ref[both]))
+
+        names, counts = np.unique(binding[success], return_counts=True)
+        print("binding constraints: " + ", ".join("%s %d" % item
+                                                  for item in zip(names,
+                                                                  counts)))
+        print()
@@ -0,0 +1,221 @@
+import numpy as np
+
+from GetGradients import complex_step
+
+from opt_mO3 import INITIAL_GUESS, BOUNDS
+
+# Settings of the batched augmented Lagrangian solver
+FEAS_TOL  = 1e-8   # Maximum (scaled) constraint violation of a solution
+OPT_TOL   = 1e-7   # Projected gradient tolerance of the inner problems
+MAX_OUTER = 25     # Multiplier/penalty updates
+MAX_INNER = 40     # Projected Newton iterations per multiplier update
+RHO0      = 10.    # Initial penalty parameter
+RHO_MAX   = 1e8    # Penalty beyond which a violated problem is infeasible
+STEPS     = 0.5**np.arange(20)  # Line search step lengths
+
+
+def batch_opt_mO3(UEFC, AR, S, initialGuess=None, nstarts=1, seed=0):
+    
+    # Batched alternative to opt_mO3: determine the maximum objective for 
+    # many (AR, S) cases at once, and optionally from several starting points
+    # per case. AR and S may be broadcastable arrays of any shape. 
+    #
+    # All cases and starts are solved together by an augmented Lagrangian 
+    # method whose inner problems (three bounded variables) are solved by a
+    # projected Newton method, so every iteration is one vectorized pass over
+    # the model (see complex_step) for the problems not yet converged.
+    #
+    # initialGuess: (N, R, mpay) or an array of them, one per case. 
+    # nstarts:      number of starts per case. The first is initialGuess (or 
+    #               the opt_mO3 default guess), the others are random points in
+    #               the bounds drawn with the given seed.
+    #
+    # Returns opt_vars (shape + (3,)), mO3, success and status arrays, where 
+    # status is "optimal", "infeasible" (no start found a point satisfying the
+    # constraints) or "failed" (feasible but not converged).
+    AR, S = np.broadcast_arrays(np.asarray(AR, dtype=np.float64), 
+                                np.asarray(S,  dtype=np.float64))
+    shape = AR.shape
+    
+    lb, ub = np.array(BOUNDS).T
+    if initialGuess is None:
+        initialGuess = INITIAL_GUESS
+    u0 = (np.broadcast_to(initialGuess, shape + (3,)) - lb)/(ub - lb)
+    
+    # Starts: axis 0 of the batch
+    rng = np.random.default_rng(seed)
+    u0  = np.concatenate([u0[np.newaxis], 
+                          rng.uniform(size=(nstarts-1,) + shape + (3,))])
+    ARk = np.broadcast_to(AR, u0.shape[:-1])
+    Sk  = np.broadcast_to(S,  u0.shape[:-1])
+    
+    u, f, c, converged = augmented_lagrangian(UEFC, u0.reshape(-1, 3), 
+                                              ARk.ravel(), Sk.ravel())
+    u         = u.reshape(u0.shape)
+    f         = f.reshape(ARk.shape)
+    converged = converged.reshape(ARk.shape)
+    feasible  = np.all(c >= -FEAS_TOL, axis=-1).reshape(ARk.shape)
+    
+    # Keep the best feasible (and preferably converged) start of each case
+    score = np.where(feasible, -f, -np.inf) + np.where(converged, 0., -1e3)
+    best  = np.argmax(score, axis=0)[np.newaxis]
+    
+    u         = np.take_along_axis(u, best[...,np.newaxis], axis=0)[0]
+    f         = np.take_along_axis(f, best, axis=0)[0]
+    feasible  = np.take_along_axis(feasible, best, axis=0)[0]
+    converged = np.take_along_axis(converged, best, axis=0)[0]
+    
+    success = feasible & converged
+    status  = np.where(success, "optimal", 
+                       np.where(feasible, "failed", "infeasible"))
+    
+    opt_vars = np.where(feasible[...,np.newaxis], lb + u*(ub - lb), 0.)
+    mO3      = np.where(feasible, (-f)**3, 0.)
+    
+    return opt_vars, mO3, success, status
+
+
+def scaled_model(UEFC, u, AR, S, gradients=True):
+    
+    # Objective f = -mO3^(1/3) (as in opt_mO3) and scaled constraints c >= 0, 
+    # with their gradients, in terms of the scaled variables u in [0,1]^3
+    lb, ub = np.array(BOUNDS).T
+    x = lb + u*(ub - lb)
+    
+    values, grads = complex_step(UEFC, np.moveaxis(x, -1, 0), AR, S, 
+                                 nvars=3 if gradients else 1)
+    
+    f = -np.cbrt(values["mO3"])
+    c = np.stack([values["Excess thrust"],
+                  (UEFC.dbmax - values["Tip deflection"])/UEFC.dbmax,
+                  (UEFC.CLdes - values["Lift coefficient"])/UEFC.CLdes], 
+                 axis=-1)
+    if not gradients:
+        return f, c
+    
+    df = (f/(3*values["mO3"]))[...,np.newaxis]*grads["mO3"]*(ub - lb)
+    dc = np.stack([grads["Excess thrust"],
+                   -grads["Tip deflection"]/UEFC.dbmax,
+                   -grads["Lift coefficient"]/UEFC.CLdes], axis=-2)*(ub - lb)
+    
+    return f, c, df, dc
+
+
+def augmented_lagrangian(UEFC, u, AR, S):
+    
+    # Batched PHR augmented Lagrangian for min f(u) s.t. c(u) >= 0, 0 <= u <= 1
+    #   L = f + sum_k (max(0, lam_k - rho*c_k)^2 - lam_k^2)/(2 rho)
+    # u is (B,3), AR and S are (B,). Returns u, f, c and a convergence flag 
+    # for every problem. Problems stop iterating once converged, or once the 
+    # penalty reaches RHO_MAX without reducing the constraint violation.
+    B   = len(u)
+    u   = u.copy()
+    lam = np.zeros((B,3))
+    rho = np.full(B, RHO0)
+    violation_old = np.full(B, np.inf)
+    converged = np.zeros(B, dtype=bool)
+    running   = np.ones(B, dtype=bool)
+    
+    for outer in range(MAX_OUTER):
+        idx = np.flatnonzero(running)
+        if len(idx) == 0:
+            break
+        
+        def lagrangian(u, i, gradients=True):
+            out  = scaled_model(UEFC, u, AR[idx[i]], S[idx[i]], gradients)
+            f, c = out[:2]
+            lami = lam[idx[i]]
+            rhoi = rho[idx[i]][:,np.newaxis]
+            mu = np.maximum(0., lami - rhoi*c)
+            L  = f + np.sum(mu**2 - lami**2, axis=-1)/(2*rhoi[:,0])
+            if not gradients:
+                return L
+            df, dc = out[2:]
+            return L, df - np.einsum('bk,bkj->bj', mu, dc)
+        
+        u[idx], inner_converged = projected_newton(lagrangian, u[idx])
+        
+        f, c = scaled_model(UEFC, u[idx], AR[idx], S[idx], gradients=False)
+        violation = np.max(np.maximum(0., -c), axis=-1)
+        
+        # Converged when feasible and complementary (lam_k = 0 or c_k = 0)
+        complementarity = np.max(np.abs(np.minimum(lam[idx], c)), axis=-1)
+        converged[idx] = inner_converged & (violation <= FEAS_TOL) \
+                         & (complementarity <= FEAS_TOL)
+        
+        lam[idx] = np.maximum(0., lam[idx] - rho[idx][:,np.newaxis]*c)
+        increase = (violation > FEAS_TOL) & (violation > 0.25*violation_old[idx])
+        rho[idx] = np.where(increase, 10*rho[idx], rho[idx])
+        violation_old[idx] = violation
+        
+        running[idx] = ~converged[idx] & (rho[idx] <= RHO_MAX)
+    
+    f, c = scaled_model(UEFC, u, AR, S, gradients=False)
+    
+    return u, f, c, converged
+
+
+def projected_newton(lagrangian, u):
+    
+    # Batched projected Newton method (Bertsekas) for min L(u), 0 <= u <= 1, 
+    # where lagrangian(u, i) returns L and its gradient for the problems i. 
+    # The Hessian is a forward difference of the exact gradients, made 
+    # positive definite by taking the absolute values of its eigenvalues.
+    B = len(u)
+    u = u.copy()
+    eye = np.eye(3)
+    delta = 1e-7
+    
+    done = np.zeros(B, dtype=bool)
+    for it in range(MAX_INNER):
+        i = np.flatnonzero(~done)
+        if len(i) == 0:
+            break
+        
+        ui   = u[i]
+        L, g = lagrangian(ui, i)
+        
+        pg = np.clip(ui - g, 0., 1.) - ui  # projected gradient
+        small = np.max(np.abs(pg), axis=-1) <= OPT_TOL
+        done[i[small]] = True
+        i, ui, L, g = i[~small], ui[~small], L[~small], g[~small]
+        if len(i) == 0:
+            break
+        
+        Hess = np.stack([lagrangian(ui + delta*eye[k], i)[1] for k in range(3)], 
+                        axis=-2) - g[:,np.newaxis,:]
+        Hess = 0.5*(Hess + np.swapaxes(Hess, -1, -2))/delta
+        
+        # Variables held at a bound do not take a Newton step
+        active = ((ui <= 0.) & (g > 0.)) | ((ui >= 1.) & (g < 0.))
+        free   = ~active
+        Hess   = np.where(free[:,:,np.newaxis] & free[:,np.newaxis,:], Hess, eye)
+        w, V   = np.linalg.eigh(Hess)
+        w      = np.maximum(np.abs(w), 1e-8*np.max(np.abs(w), axis=-1, 
+                                                   keepdims=True) + 1e-12)
+        d      = -np.einsum('bij,bj,bkj,bk->bi', V, 1/w, V, g)
+        d      = np.where(active, 0., d)
+        
+        # Armijo backtracking along the projection arc, with all step lengths
+        # evaluated at once. Steepest descent steps are the fallback when no 
+        # Newton step is accepted.
+        n  = len(i)
+        D  = np.stack([d, -g], axis=1)                          # (n,2,3)
+        un = np.clip(ui[:,np.newaxis,np.newaxis,:] 
+                     + STEPS[:,np.newaxis]*D[:,:,np.newaxis,:], 0., 1.)
+        Ln = lagrangian(un.reshape(-1,3), np.repeat(i, un.shape[1]*un.shape[2]), 
+                        gradients=False).reshape(un.shape[:-1])
+        accept = Ln <= L[:,np.newaxis,np.newaxis] \
+                 + 1e-4*np.sum(g[:,np.newaxis,np.newaxis,:]*(un - ui[:,np.newaxis,np.newaxis,:]), 
+                               axis=-1)
+        accept = accept.reshape(n, -1)
+        first  = np.argmax(accept, axis=-1)
+        found  = accept[np.arange(n), first]
+        ui[found] = un.reshape(n, -1, 3)[np.arange(n), first][found]
+        u[i] = ui
+        
+        # No decrease possible at round-off level: converged as far as the 
+        # floating point evaluation of L allows
+        done[i[~found]] = True
+    
+    return u, done
@@ -0,0 +1,284 @@
+# Benchmark suite: fixed reference cases of the VLM, the model, the optimizer
+# and the scans, timed and checked against the results stored in
+# benchmark_baseline.json.
+#
+# For each case it records the wall time (best and median of several runs),
+# the evaluation counts reported by the solvers, the peak memory allocated
+# (tracemalloc, in a separate run so that tracing does not slow down the
+# timings) and the largest relative difference of its results from the
+# baseline. Everything is written as JSON.
+#
+#   python benchmark.py                    all cases, compared to the baseline
+#   python benchmark.py vlm opt_mO3        some of the cases
+#   python benchmark.py --update-baseline  store the results as new baseline
+#
+# The exit status is 1 if a result differs from the baseline by more than the
+# tolerance of its case.
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import numpy as np
+
+import UEFC_wing
+import opt_m03_legit
+from GetUEFC  import UEFC
+from opt_mO3  import opt_mO3
+from scan_ARS import scan_grid
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "benchmark_baseline.json")
+
+REPEATS = 5
+
+# Time ratio to the baseline above which a case is reported as slower
+SLOWER = 1.5
+
+
+def case_vlm():
+
+    # The wing of vlm.py at CL = 0.61, including the influence matrix
+    # assembly and factorization
+    wing = UEFC_wing.UEFC_wing(b=1.5, croot=0.2, ctip=0.1, agroot=3.13,
+                               agtip=-5.0+3.13, dihedral=10.)
+    G, alpha = wing.solve(CL=0.61)
+    CL, CDi, e0, clmax = wing.calc_aeroperf(G)
+
+    results = {"G": G, "alpha": alpha, "CL": CL, "CDi": CDi, "e0": e0,
+               "clmax": clmax}
+    return results, {"panels": len(wing.panels), "solves": 1}
+
+
+def case_UEFC_wing():
+
+    # The wing of UEFC_wing.py at CL = 0.85
+    wing = UEFC_wing.UEFC_wing(1.5, 0.2, 0.1, 0., -5.0, 10.)
+    G, alpha = wing.solve(CL=0.85)
+    CL, CDi, e0, clmax = wing.calc_aeroperf(G)
+
+    results = {"G": G, "alpha": alpha, "CL": CL, "CDi": CDi, "e0": e0,
+               "clmax": clmax}
+    return results, {"panels": len(wing.panels), "solves": 1}
+
+
+def case_model():
+
+    # The Get* chain: all model quantities (UEFC.evaluate) for a 100x100
+    # array of operating points at AR = 11, S = 0.3, and the mO3 gradient at
+    # one of them
+    aircraft = UEFC()
+    N, R = np.meshgrid(np.linspace(1.1, 3., 100), np.linspace(2., 12., 100),
+                       indexing="ij")
+    mpay = np.full(N.shape, 300.)
+    values = aircraft.evaluate(N, R, mpay, 11., 0.3)
+    gradient = aircraft.gradients((2., 6., 300.), 11., 0.3)["mO3"]
+
+    results = {"mO3": values["mO3"].sum(), "T": values["T"].sum(),
+               "db": values["db"].sum(), "gradient": gradient}
+    return results, {"evaluations": N.size, "gradients": 1}
+
+
+def case_opt_mO3():
+
+    # The AR = 11, S = 0.3 case of opt_mO3.py
+    opt_vars, mO3, success, info = opt_mO3(UEFC(), 11., 0.3, full_output=True)
+
+    results = {"opt_vars": opt_vars, "mO3": mO3, "success": float(success)}
+    return results, {name: info[name] for name in ("nit", "nfev", "njev")}
+
+
+def case_scan_ARS():
+
+    # An 11x11 scan_ARS grid, serial
+    ARarray = np.linspace(5,   15,  11)
+    Sarray  = np.linspace(0.1, 0.7, 11)
+    result  = scan_grid(UEFC(), ARarray, Sarray, workers=1, verbose=False)
+
+    results = {"mO3": result["mO3"], "N": result["N"]}
+    return results, {"optimizations": result.size,
+                     "nit":  int(result["nit"].sum()),
+                     "nfev": int(result["nfev"].sum())}
+
+
+def case_opt_m03_legit():
+
+    # One pass of opt_m03_legit.coupled_solve: an mO3 optimization over
+    # (N, R, mpay, AR, S) and the VLM analysis of its wing
+    solution = opt_m03_legit.coupled_solve(maxiter=1, verbose=False)
+
+    results = {"opt_vars": solution["opt_vars"], "mO3": solution["mO3"],
+               "e0": solution["e0"], "CLdes": solution["CLdes"]}
+    return results, {"passes": solution["iterations"]}
+
+
+# Case functions and the relative tolerance of their results
+CASES = {"vlm":           (case_vlm,           1e-10),
+         "UEFC_wing":     (case_UEFC_wing,     1e-10),
+         "model":         (case_model,         1e-10),
+         "opt_mO3":       (case_opt_mO3,       1e-6),
+         "scan_ARS":      (case_scan_ARS,      1e-5),
+         "opt_m03_legit": (case_opt_m03_legit, 1e-5)}
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {name: _jsonable(item) for name, item in value.items()}
+    return np.asarray(value, dtype=np.float64).tolist()
+
+
+def run_case(name, repeats=REPEATS):
+
+    # Time, evaluation counts, peak memory and results of case name
+    function, tol = CASES[name]
+
+    times = []
+    for repeat in range(repeats):
+        start = time.perf_counter()
+        results, counts = function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"time_s":        min(times),
+            "time_median_s": float(np.median(times)),
+            "repeats":       repeats,
+            "counts":        {key: int(value) for key, value in counts.items()},
+            "peak_memory_mb": peak/2**20,
+            "results":       _jsonable(results)}
+
+
+def max_relative_difference(results, reference):
+
+    # Largest |result - reference|/|reference| over all result values, with
+    # reference values below 1e-12 compared absolutely. inf if the results do
+    # not have the same quantities and shapes.
+    if set(results) != set(reference):
+        return np.inf
+
+    difference = 0.
+    for name in results:
+        value = np.asarray(results[name],   dtype=np.float64)
+        ref   = np.asarray(reference[name], dtype=np.float64)
+        if value.shape != ref.shape:
+            return np.inf
+        if value.size:
+            scale = np.maximum(np.abs(ref), 1e-12)
+            difference = max(difference, np.max(np.abs(value - ref)/scale))
+
+    return float(difference)
+
+
+def compare(report, baseline):
+
+    # Add the comparison with the baseline to the report of each case: the
+    # relative difference of the results ("accuracy"), the time ratio and
+    # the change in evaluation counts. Returns True if all results are within
+    # tolerance.
+    ok = True
+    for name, case in report["cases"].items():
+        reference = baseline.get("cases", {}).get(name)
+        if reference is None:
+            case["status"] = "no baseline"
+            continue
+
+        difference = max_relative_difference(case["results"],
+                                             reference["results"])
+        accurate = difference <= CASES[name][1]
+        ok &= accurate
+
+        case["accuracy"]   = difference
+        case["time_ratio"] = case["time_s"]/reference["time_s"]
+        case["count_changes"] = {key: value - reference["counts"][key]
+                                 for key, value in case["counts"].items()
+                                 if key in reference["counts"]}
+        case["status"] = "mismatch" if not accurate else \
+                         "slower" if case["time_ratio"] > SLOWER else "ok"
+
+    return ok
+
+
+def run_benchmarks(names=None, repeats=REPEATS, baseline_path=BASELINE_FILE,
+                   verbose=True):
+
+    # Run the cases names (default: all of CASES) and compare them with the
+    # baseline, if there is one. Returns the report (a JSON-serializable
+    # dict) and whether all results are within tolerance.
+    names = list(CASES) if not names else names
+    for name in names:
+        if name not in CASES:
+            raise ValueError("Case " + str(name) + " not recognized; use one "
+                             "of " + ", ".join(CASES))
+
+    report = {"python":   platform.python_version(),
+              "numpy":    np.__version__,
+              "platform": platform.platform(),
+              "cases":    {}}
+    for name in names:
+        report["cases"][name] = run_case(name, repeats)
+        if verbose:
+            case = report["cases"][name]
+            print("%-14s %9.4f s %9.1f MB  %s" % (name, case["time_s"],
+                  case["peak_memory_mb"],
+                  ", ".join("%s %d" % item for item in case["counts"].items())))
+
+    ok = True
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            ok = compare(report, json.load(f))
+
+        if verbose:
+            print()
+            for name, case in report["cases"].items():
+                if "accuracy" in case:
+                    print("%-14s %-12s accuracy %0.1e, time x%0.2f"
+                          % (name, case["status"], case["accuracy"],
+                             case["time_ratio"]))
+                else:
+                    print("%-14s %s" % (name, case["status"]))
+
+    return report, ok
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="UEFC benchmark suite")
+    parser.add_argument("cases", nargs="*", help="cases to run (default all)")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="JSON report file ('-' for standard output)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store the results of the cases run as baseline")
+    args = parser.parse_args()
+
+    report, ok = run_benchmarks(args.cases, args.repeats, args.baseline,
+                                verbose=args.output != "-")
+
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=1)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+
+    if args.update_baseline:
+        baseline = {"cases": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        for name, case in report["cases"].items():
+            baseline["cases"][name] = {key: case[key] for key in
+                                       ("time_s", "counts", "results")}
+        baseline.update({key: report[key] for key in
+                         ("python", "numpy", "platform")})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1)
+        ok = True
+
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,102 @@
+# Import-time budget of the numerical modules. Each module is imported in a
+# fresh interpreter (as in a new process pool worker or a short batch job),
+# after NumPy and scipy.optimize: the cost of a module is its import time on
+# top of these, measured in the same interpreter, so that it does not depend
+# on how fast the machine loads SciPy. The cost is the median over several
+# interpreters, and the modules each one pulls in are checked against the
+# plotting and interactive packages that only the plotting module may load.
+#
+# Run python import_budget.py: it prints a table and exits with status 1 if a
+# module loads a forbidden package or is over its budget.
+
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+
+# Budget of each module (ms over NumPy and scipy.optimize, which cost about
+# 250 ms together). The budgets leave a margin of about 3x over the measured
+# costs, which are mostly those of the other standard library and SciPy
+# modules a module imports (concurrent.futures and sqlite3 for scan_ARS and
+# parametric_study, scipy.interpolate for wing_surrogate).
+BUDGETS_MS = {"GetUEFC":            15,
+              "UEFC_wing":          20,
+              "opt_mO3":            20,
+              "batch_opt_mO3":      20,
+              "active_set_opt_mO3": 20,
+              "report_opt_mO3":     20,
+              "scan_ARS":           90,
+              "opt_m03_legit":      40,
+              "wing_surrogate":     150,
+              "parametric_study":   90}
+
+# Packages the numerical modules must not import
+FORBIDDEN = ("matplotlib", "IPython", "PyQt5", "PySide2", "PyQt6", "PySide6")
+
+REPEATS = 9
+
+SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+import numpy, scipy.optimize
+baseline = time.perf_counter()
+import {module}
+end = time.perf_counter()
+print(json.dumps({{"baseline_ms": 1e3*(baseline - start),
+                   "ms": 1e3*(end - baseline),
+                   "forbidden": [name for name in {forbidden!r}
+                                 if name in sys.modules]}}))
+"""
+
+
+def measure(module, repeats=REPEATS):
+
+    # Median import cost (ms) of module over NumPy and scipy.optimize in
+    # fresh interpreters, the median import time of these (ms) and the
+    # forbidden packages it loads
+    script = SCRIPT.format(module=module, forbidden=FORBIDDEN)
+    cwd    = os.path.dirname(os.path.abspath(__file__))
+
+    times     = []
+    baselines = []
+    forbidden = set()
+    for repeat in range(repeats):
+        output = subprocess.run([sys.executable, "-c", script], cwd=cwd,
+                                check=True, capture_output=True, text=True)
+        result = json.loads(output.stdout.splitlines()[-1])
+        times.append(result["ms"])
+        baselines.append(result["baseline_ms"])
+        forbidden.update(result["forbidden"])
+
+    return float(np.median(times)), float(np.median(baselines)), \
+           sorted(forbidden)
+
+
+def check_budget(budgets=BUDGETS_MS, repeats=REPEATS, verbose=True):
+
+    # Measure every module of budgets. Returns a dict of module:
+    # (cost in ms, forbidden packages, within budget) and prints a table,
+    # with the import time of NumPy and scipy.optimize for reference.
+    results = {}
+    if verbose:
+        print("%-20s %8s %8s %9s  %s" % ("module", "ms", "budget",
+                                         "baseline", "status"))
+    for module, budget in budgets.items():
+        ms, baseline, forbidden = measure(module, repeats)
+        ok = ms <= budget and not forbidden
+        results[module] = (ms, forbidden, ok)
+
+        if verbose:
+            status = "ok" if ok else "OVER BUDGET" if not forbidden else \
+                     "imports " + ", ".join(forbidden)
+            print("%-20s %8.1f %8d %9.0f  %s" % (module, ms, budget, baseline,
+                                                 status))
+
+    return results
+
+
+if __name__ == "__main__":
+
+    results = check_budget()
+    sys.exit(0 if all(ok for ms, forbidden, ok in results.values()) else 1)
@@ -0,0 +1,247 @@
+# Opt-in instrumentation of the model, the VLM and the optimizers: call
+# counts and times of every UEFC method, of the Get* functions behind them,
+# of the UEFC_wing solve/assembly methods and of the objective and constraint
+# callbacks given to SciPy's minimize, plus the SLSQP iterate history of each
+# optimization.
+#
+#   with instrument() as report:
+#       opt_mO3(aircraft, 11, 0.3)
+#   print(report.summary())
+#   report.dump("profile.json")
+#
+# The functions are only replaced by counting wrappers inside the context and
+# restored on exit, so there is no overhead at all outside of it. Worker
+# processes are not instrumented: run scans with workers=1.
+
+import json
+import time
+import importlib
+from contextlib import contextmanager
+
+import numpy as np
+
+import GetUEFC
+import UEFC_wing
+
+# UEFC_wing methods that are instrumented
+WING_METHODS = ("build_mesh", "solve", "solve_many", "aeroperf",
+                "calc_CL_clmax", "get_basis", "sensitivities", "calc_AIC",
+                "get_LU", "calc_Kdrag", "calccldist", "calc_aeroperf")
+
+# Modules whose minimize calls are instrumented
+OPTIMIZER_MODULES = ("opt_mO3", "opt_m03_legit")
+
+_active = False
+
+
+class InstrumentationReport:
+
+    # Filled by instrument(). functions maps a name ("UEFC.drag_coefficient",
+    # "GetCD", "UEFC_wing.solve", "opt_mO3.objective", ...) to its number of
+    # calls, total time and self time (excluding the instrumented functions
+    # it calls), all in seconds. For the Get* functions, the calls are the
+    # actual computations: the UEFC method calls minus the memoized ones.
+    # optimizations lists one record per minimize call: the module, the
+    # iterate history (x, objective and constraint values at x0 and after
+    # each iteration), nit, nfev, njev, success, message and time.
+
+    def __init__(self):
+        self.functions     = {}
+        self.optimizations = []
+        self.wall_time_s   = 0.
+        self._stack        = [0.]    # Time of the instrumented callees
+        self._paused       = False   # While recording an iterate
+
+
+    def record(self, name, fcn):
+
+        # Wrapper of fcn that counts its calls and times under name
+        stats = self.functions.setdefault(name, {"calls": 0, "time_s": 0.,
+                                                 "self_time_s": 0.})
+        stack = self._stack
+
+        def wrapper(*args, **kwargs):
+            if self._paused:
+                return fcn(*args, **kwargs)
+
+            stack.append(0.)
+            start = time.perf_counter()
+            try:
+                return fcn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                callees = stack.pop()
+                stack[-1] += elapsed
+                stats["calls"]       += 1
+                stats["time_s"]      += elapsed
+                stats["self_time_s"] += elapsed - callees
+
+        wrapper.__wrapped__ = fcn
+        return wrapper
+
+
+    def record_minimize(self, module, minimize):
+
+        # Wrapper of scipy.optimize.minimize, as called by module, that times
+        # the objective, gradient and constraint callbacks and records the
+        # iterate history
+        def wrapper(fun, x0, *args, **kwargs):
+            objective   = fun
+            constraints = kwargs.get("constraints", ())
+            if isinstance(constraints, dict):
+                constraints = [constraints]
+
+            history = []
+
+            def store(x):
+                # Values at x, without counting them as evaluations
+                self._paused = True
+                try:
+                    history.append({
+                        "x":           np.array(x, dtype=np.float64).tolist(),
+                        "objective":   float(objective(x)),
+                        "constraints": [np.asarray(constraint["fun"](x),
+                                                   dtype=np.float64).tolist()
+                                        for constraint in constraints]})
+                finally:
+                    self._paused = False
+
+            callback = kwargs.get("callback")
+
+            def record_iterate(xk):
+                store(xk)
+                if callback is not None:
+                    callback(xk)
+
+            fun = self.record(module + ".objective", fun)
+            if callable(kwargs.get("jac")):
+                kwargs["jac"] = self.record(module + ".objective_jac",
+                                            kwargs["jac"])
+            wrapped = []
+            for i, constraint in enumerate(constraints):
+                constraint = dict(constraint)
+                name = "%s.constraint[%d]" % (module, i)
+                constraint["fun"] = self.record(name, constraint["fun"])
+                if callable(constraint.get("jac")):
+                    constraint["jac"] = self.record(name + "_jac",
+                                                    constraint["jac"])
+                wrapped.append(constraint)
+            if constraints:
+                kwargs["constraints"] = wrapped
+            kwargs["callback"] = record_iterate
+
+            record = {"module": module, "history": history}
+            self.optimizations.append(record)
+
+            store(np.asarray(x0, dtype=np.float64))
+            start = time.perf_counter()
+            try:
+                result = self.record(module + ".minimize", minimize)(
+                                     fun, x0, *args, **kwargs)
+            except Exception as error:
+                record["error"] = repr(error)
+                raise
+            finally:
+                record["time_s"] = time.perf_counter() - start
+
+            record.update({"nit":     int(getattr(result, "nit", 0)),
+                           "nfev":    int(getattr(result, "nfev", 0)),
+                           "njev":    int(getattr(result, "njev", 0)),
+                           "success": bool(result.success),
+                           "message": str(result.message)})
+            return result
+
+        return wrapper
+
+
+    def as_dict(self):
+        return {"wall_time_s":   self.wall_time_s,
+                "functions":     self.functions,
+                "optimizations": self.optimizations}
+
+
+    def dump(self, path):
+
+        # Save the report as JSON
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=1)
+
+
+    def summary(self, n=25):
+
+        # Table of the n functions with the most self time
+        lines = ["%-36s %9s %10s %10s" % ("function", "calls", "time (s)",
+                                          "self (s)")]
+        ranked = sorted(self.functions.items(),
+                        key=lambda item: -item[1]["self_time_s"])
+        for name, stats in ranked[:n]:
+            if stats["calls"]:
+                lines.append("%-36s %9d %10.4f %10.4f"
+                             % (name, stats["calls"], stats["time_s"],
+                                stats["self_time_s"]))
+
+        if self.optimizations:
+            lines.append("%d optimizations, %d iterations in total"
+                         % (len(self.optimizations),
+                            sum(len(record["history"]) - 1
+                                for record in self.optimizations)))
+        lines.append("wall time %0.4f s" % self.wall_time_s)
+        return "\n".join(lines)
+
+
+@contextmanager
+def instrument():
+
+    # Instrument the model, the VLM and the optimizers within the context
+    # (see InstrumentationReport). Contexts may not be nested.
+    global _active
+    if _active:
+        raise RuntimeError("instrument() contexts may not be nested")
+
+    report  = InstrumentationReport()
+    patches = []  # (owner, name, original)
+
+    def patch(owner, name, wrapper):
+        patches.append((owner, name, owner.__dict__[name]))
+        setattr(owner, name, wrapper)
+
+    for name, method in vars(GetUEFC.UEFC).items():
+        if callable(method) and not name.startswith("_") \
+                and name != "evaluation_context":
+            patch(GetUEFC.UEFC, name, report.record("UEFC." + name, method))
+
+    for name, fcn in vars(GetUEFC).items():
+        if name.startswith("Get") and callable(fcn):
+            patch(GetUEFC, name, report.record(name, fcn))
+
+    for name in WING_METHODS:
+        patch(UEFC_wing.UEFC_wing, name,
+              report.record("UEFC_wing." + name,
+                            UEFC_wing.UEFC_wing.__dict__[name]))
+
+    for module_name in OPTIMIZER_MODULES:
+        module = importlib.import_module(module_name)
+        patch(module, "minimize",
+              report.record_minimize(module_name, module.minimize))
+
+    _active = True
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.wall_time_s = time.perf_counter() - start
+        for owner, name, original in reversed(patches):
+            setattr(owner, name, original)
+        _active = False
+
+
+if __name__ == "__main__":
+
+    from GetUEFC import UEFC
+    from opt_mO3 import opt_mO3
+
+    # Where the AR = 11, S = 0.3 optimization of opt_mO3.py spends its time
+    with instrument() as report:
+        opt_mO3(UEFC(), 11, 0.3)
+
+    print(report.summary())
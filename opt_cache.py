@@ -0,0 +1,124 @@
+# Persistent on-disk cache of opt_mO3 results.
+
+import json
+import hashlib
+import sqlite3
+
+import numpy as np
+
+# Default location of the cache file
+CACHE_FILE = "opt_cache.sqlite"
+
+# Increase when a change to the model or to the optimizers invalidates the
+# results stored so far
+CACHE_VERSION = 1
+
+
+def _jsonable(value):
+    # json.dumps fallback for NumPy values
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("Cannot store %r in the optimization cache" % (value,))
+
+
+def aircraft_parameters(UEFC):
+
+    # All constants set by UEFC.__init__ (taper, tau, CLdes, e0, dbmax, ...)
+    return {name: value for name, value in vars(UEFC).items()
+            if name != "memo"}
+
+
+def design_key(UEFC, AR, S, settings):
+
+    # Content address of an optimization: a SHA-256 hash of every aircraft
+    # constant, the (AR, S) point and the solver settings. Floats are hashed
+    # through their exact (round-trip) representation.
+    record = {"version":    CACHE_VERSION,
+              "parameters": aircraft_parameters(UEFC),
+              "AR":         float(AR),
+              "S":          float(S),
+              "settings":   settings}
+    text = json.dumps(record, sort_keys=True, default=_jsonable)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class OptCache:
+
+    # Append-only SQLite store of optimization results, keyed by design_key.
+    # Each value holds the full opt_mO3 result (opt_vars, mO3, success and
+    # optimizer info), the model breakdown at the optimum (UEFC.evaluate) and
+    # the aircraft parameters, AR and S it belongs to.
+    #
+    # An OptCache can be passed to worker processes: each process opens its
+    # own connection to the file on first use.
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.connection = None
+
+    def __getstate__(self):
+        return {"path": self.path, "connection": None}
+
+    def _connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, timeout=60.)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, AR REAL, S REAL, value TEXT)")
+        return self.connection
+
+    def __len__(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key):
+
+        # Stored value for key (see put), or None
+        row = self._connect().execute(
+            "SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        value = json.loads(row[0])
+        value["opt_vars"] = np.array(value["opt_vars"])
+        return value
+
+    def put(self, key, UEFC, AR, S, opt_vars, mO3, success, info):
+
+        # Store an opt_mO3 result. The first result stored for a key is kept.
+        if success:
+            breakdown = UEFC.evaluate(opt_vars[0], opt_vars[1], opt_vars[2],
+                                      AR, S)
+            breakdown = {name: np.asarray(value).item()
+                         for name, value in breakdown.items()}
+        else:
+            breakdown = None
+
+        value = {"parameters": aircraft_parameters(UEFC),
+                 "AR":         float(AR),
+                 "S":          float(S),
+                 "opt_vars":   opt_vars,
+                 "mO3":        mO3,
+                 "success":    bool(success),
+                 "info":       info,
+                 "breakdown":  breakdown}
+
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?)",
+                (key, float(AR), float(S),
+                 json.dumps(value, default=_jsonable)))
+
+    def records(self):
+
+        # All stored values, e.g. to re-plot a sweep without recomputing it
+        for (value,) in self._connect().execute(
+                "SELECT value FROM results ORDER BY AR, S"):
+            value = json.loads(value)
+            value["opt_vars"] = np.array(value["opt_vars"])
+            yield value
@@ -1,9 +1,9 @@
 import numpy as np
 from scipy.optimize import minimize
-from scipy import optimize
 from GetUEFC import UEFC
 from calc_mO3 import calc_mO3
 import UEFC_wing
+from UEFC_wing import AGROOT, TWIST
 
 # Aircraft Fixed Constants
 CL_MAX = 0.8
@@ -38,9 +38,16 @@ CL_DES_INITIAL = 0.8
 CL_GUESS = (0.7)
 CL_BOUNDS = [0, CL_MAX]
 
+# Coupled (mO3, VLM) solver params
+COUPLED_TOL = 1e-6  # Convergence tolerance on (e0, CLdes) updates
+COUPLED_MAXITER = 20
+WING_REUSE_TOL = 1e-4  # Relative AR change below which the VLM wing is reused
 
-def get_specified_uefc(e0, CLdes):
-    specified_uefc = UEFC(
+
+def get_specified_uefc(e0, CLdes, **params):
+    # params: any other UEFC constructor parameters, overriding the fixed
+    # constants above (e.g. taper=0.6, tau=0.1 in a parametric study)
+    specified_params = dict(
         taper=TAPER,
         tau=TAU,
         CLdes=CLdes,
@@ -48,26 +55,32 @@ def get_specified_uefc(e0, CLdes):
         dbmax=DB_MAX,
         dihedral=DIHEDRAL,
     )
+    specified_params.update(params)
+    specified_uefc = UEFC(**specified_params)
     return specified_uefc
 
 
-def opt_mO3(e0, CLdes):
+def opt_mO3(e0, CLdes, initialGuess=None, **params):
+    # initialGuess: optional (N, R, mpay, AR, S) starting point, e.g. the
+    # optimum of the previous coupled iteration.
+    #
+    # One aircraft serves the objective and all constraints, so that its
+    # evaluation_context can share intermediate quantities between them
+    specified_uefc = get_specified_uefc(e0, CLdes, **params)
+
     def mO3_fcn(opt_vars):
-        specified_uefc = get_specified_uefc(e0, CLdes)
         mO3 = -calc_mO3(specified_uefc, opt_vars[:4], opt_vars[3], opt_vars[4]) ** (
             1.0 / 3.0
         )
         return mO3
 
     def T_constraint_fcn(opt_vars):
-        specified_uefc = get_specified_uefc(e0, CLdes)
         constraint_value = specified_uefc.excess_thrust(
             opt_vars[:4], opt_vars[3], opt_vars[4]
         )
         return constraint_value
 
     def db_constraint_fcn(opt_vars):
-        specified_uefc = get_specified_uefc(e0, CLdes)
         constraint_value = (
             specified_uefc.dbmax
             - specified_uefc.wing_tip_deflection(
@@ -77,20 +90,37 @@ def opt_mO3(e0, CLdes):
         return constraint_value
 
     def CL_constraint_fcn(opt_vars):
-        specified_uefc = get_specified_uefc(e0, CLdes)
         constraint_value = (
             specified_uefc.CLdes
             - specified_uefc.lift_coefficient(opt_vars[:4], opt_vars[3], opt_vars[4]),
         )
         return constraint_value
 
-    initialGuess = (
-        N_INITIAL_GUESS,
-        R_INITIAL_GUESS,
-        MPAY_INITIAL_GUESS,
-        AR_INITIAL_GUESS,
-        S_INITIAL_GUESS,
-    )
+    # Exact gradients with respect to (N, R, mpay, AR, S)
+    def gradients(opt_vars):
+        return specified_uefc.gradients(opt_vars[:3], opt_vars[3], opt_vars[4])
+
+    def mO3_jac(opt_vars):
+        mO3 = calc_mO3(specified_uefc, opt_vars[:4], opt_vars[3], opt_vars[4])
+        return -(1.0 / 3.0) * mO3 ** (-2.0 / 3.0) * gradients(opt_vars)["mO3"]
+
+    def T_constraint_jac(opt_vars):
+        return gradients(opt_vars)["Excess thrust"]
+
+    def db_constraint_jac(opt_vars):
+        return -gradients(opt_vars)["Tip deflection"]
+
+    def CL_constraint_jac(opt_vars):
+        return -gradients(opt_vars)["Lift coefficient"]
+
+    if initialGuess is None:
+        initialGuess = (
+            N_INITIAL_GUESS,
+            R_INITIAL_GUESS,
+            MPAY_INITIAL_GUESS,
+            AR_INITIAL_GUESS,
+            S_INITIAL_GUESS,
+        )
     bounds = (
         (N_LOWER_BOUND, N_UPPER_BOUND),
         (R_LOWER_BOUND, R_UPPER_BOUND),
@@ -103,37 +133,53 @@ def opt_mO3(e0, CLdes):
     method = "SLSQP"
 
     # Excess thrust (max - required thrust) must be positive.
-    T_constraint = {"type": "ineq", "fun": T_constraint_fcn}
+    T_constraint = {
+        "type": "ineq",
+        "fun": T_constraint_fcn,
+        "jac": T_constraint_jac,
+    }
 
     # Wingtip deflection must be less than the maximum allowed value.
-    db_constraint = {"type": "ineq", "fun": db_constraint_fcn}
+    db_constraint = {
+        "type": "ineq",
+        "fun": db_constraint_fcn,
+        "jac": db_constraint_jac,
+    }
 
     # Lift coefficient must be less than the maximum allowed cruise value.
-    CL_constraint = {"type": "ineq", "fun": CL_constraint_fcn}
+    CL_constraint = {
+        "type": "ineq",
+        "fun": CL_constraint_fcn,
+        "jac": CL_constraint_jac,
+    }
 
     constraints = [T_constraint, db_constraint, CL_constraint]
 
-    try:
-        result = minimize(
-            fun=mO3_fcn,
-            x0=initialGuess,
-            bounds=bounds,
-            constraints=constraints,
-            method=method,
-            options={"maxiter": 40000},
-        )
+    with specified_uefc.evaluation_context():
+        try:
+            result = minimize(
+                fun=mO3_fcn,
+                x0=initialGuess,
+                jac=mO3_jac,
+                bounds=bounds,
+                constraints=constraints,
+                method=method,
+                options={"maxiter": 40000},
+            )
 
-        success = result.success
+            success = result.success
 
-    except:  # Optimizer failed
-        result = None
-        success = False
+        except:  # Optimizer failed
+            result = None
+            success = False
 
     if success:
         opt_vars_maxObj = result.x  # Variables that maximize objective
-        max_uefc = get_specified_uefc(e0, CLdes)
         mO3_max = calc_mO3(
-            max_uefc, opt_vars_maxObj[:4], opt_vars_maxObj[3], opt_vars_maxObj[4]
+            specified_uefc,
+            opt_vars_maxObj[:4],
+            opt_vars_maxObj[3],
+            opt_vars_maxObj[4],
         )
 
     else:  # If optimizer fails
@@ -143,68 +189,165 @@ def opt_mO3(e0, CLdes):
     return opt_vars_maxObj, mO3_max, success
 
 
-def opt_vlm(uefc, AR, S, CLdes):
+def get_wing(uefc, AR, S, wing=None):
+    # VLM wing of the aircraft at (AR, S). A previous wing is returned as is
+    # (with its factorized VLM system) when its aspect ratio is within
+    # WING_REUSE_TOL of AR: CL, cl and e0 are dimensionless, so they do not
+    # depend on S for a given planform shape. The reused wing is only an
+    # approximation, so coupled_solve confirms convergence with an exact one.
+    if wing is not None and abs(wing.get_AR() - AR) <= WING_REUSE_TOL * AR:
+        return wing
+
     wing_dims = uefc.wing_dimensions(AR, S)
     # Set-up a wing object. Inputs: wingspan, root chord, tip chord, root incidence
     # angle, tip incidence angle, dihedral angle.
     # Note: wing twist is defined as (agroot - agtip). Therefore, this wing has a
     # twist of +5 degrees, and the tip is at a lower incidence angle than the root.
-    PV = UEFC_wing.UEFC_wing(
+    return UEFC_wing.UEFC_wing(
         b=wing_dims["Span"],
         croot=wing_dims["Root chord"],
         ctip=wing_dims["Tip chord"],
-        agroot=3.13,
-        agtip=-5.0 + 3.13,
-        dihedral=DIHEDRAL,
+        agroot=AGROOT,
+        agtip=-TWIST + AGROOT,
+        dihedral=uefc.dihedral,
     )
 
-    def constraint_fcn(CL):
-        # Solve the flow around the wing at a desired CL
-        G, alpha = PV.solve(CL=CL)        
-        AR = PV.get_AR()
-        S = PV.get_S()
-        cl, y = PV.calccldist(G)
-        CL, CDi, e0, clmax = PV.calc_aeroperf(G)
-        return clmax - CL_MAX
-
-    # Find when constraint = 0: CL corresponding to max_cl = 0.8
-    result = optimize.root_scalar(constraint_fcn, bracket=CL_BOUNDS)
+
+def opt_vlm(uefc, AR, S, CLdes, wing=None, surrogate=None):
+    # wing: optional UEFC_wing of a previous call, reused if its geometry is
+    # close enough (see get_wing)
+    # surrogate: optional wing_surrogate.WingSurrogate, used instead of a
+    # VLM solve (it falls back to the VLM outside its trained envelope)
+    if surrogate is not None:
+        planform = (AR, uefc.taper, TWIST, uefc.dihedral)
+        CL = surrogate.CL_at_clmax(*planform, CL_MAX)
+        return CL, surrogate.e0(*planform, CL)
+
+    PV = get_wing(uefc, AR, S, wing)
+
+    # Find the CL corresponding to max_cl = CL_MAX. The cl distribution is 
+    # linear in alpha, so this comes in closed form from the wing's basis 
+    # solutions rather than from a root-finding loop of VLM solves.
+    CL = PV.calc_CL_clmax(CL_MAX)
     
-    G, alpha = PV.solve(CL=result.root)        
-    AR = PV.get_AR()
-    S = PV.get_S()
-    cl, y = PV.calccldist(G)
+    G, alpha = PV.solve(CL=CL)        
     CL, CDi, e0, clmax = PV.calc_aeroperf(G)
     
     return CL, e0
 
 
+def coupled_solve(
+    e0=1.0,
+    CLdes=CL_DES_INITIAL,
+    tol=COUPLED_TOL,
+    maxiter=COUPLED_MAXITER,
+    verbose=True,
+    surrogate=None,
+    **params
+):
+    # Fixed point of the coupled problem: the mO3 optimum for (e0, CLdes)
+    # must have the span efficiency e0 and the CL at which clmax = CL_MAX,
+    # computed by opt_vlm, that it was optimized with. The (e0, CLdes)
+    # iterates are relaxed with Aitken's dynamic factor, each SLSQP run is
+    # started from the previous optimum, and the VLM wing is reused while its
+    # aspect ratio does not change (see get_wing). Stops when the update of
+    # (e0, CLdes) is below tol, computed with the wing rebuilt at the exact
+    # AR if it was reused. With a wing_surrogate.WingSurrogate, e0 and
+    # CLdes come from the surrogate instead of the VLM (see opt_vlm).
+    #
+    # Returns a dict with the optimum ("opt_vars", "mO3", "success"), the
+    # converged "e0" and "CLdes", "converged", the number of (mO3, VLM)
+    # passes "iterations" and the (e0, CLdes) "history".
+    x = np.array([e0, CLdes], dtype=float)
+    x_prev = r_prev = None
+    omega = 1.0
+    opt_vars = wing = previous = None
+    history = [tuple(x)]
+    converged = False
+
+    for iteration in range(1, maxiter + 1):
+        e0, CLdes = x
+        opt_vars_new, mO3, success = opt_mO3(e0, CLdes, opt_vars, **params)
+        if not success and opt_vars is not None:
+            # Warm start failed: fall back to the default initial guess
+            opt_vars_new, mO3, success = opt_mO3(e0, CLdes, **params)
+        if not success:
+            break
+        opt_vars = opt_vars_new
+
+        uefc = get_specified_uefc(e0, CLdes, **params)
+        AR, S = opt_vars[3], opt_vars[4]
+        CL = uefc.lift_coefficient(opt_vars[:3], AR, S)
+        if surrogate is None:
+            previous = wing
+            wing = get_wing(uefc, AR, S, wing)
+        CLdes_new, e0_new = opt_vlm(uefc, AR, S, CL, wing, surrogate)
+        r = np.array([e0_new, CLdes_new]) - x
+
+        if np.max(np.abs(r)) < tol and wing is not None and wing is previous:
+            # Converged with a reused wing: confirm with the exact geometry
+            wing = get_wing(uefc, AR, S)
+            CLdes_new, e0_new = opt_vlm(uefc, AR, S, CL, wing)
+            r = np.array([e0_new, CLdes_new]) - x
+
+        # Aitken relaxation of the fixed-point update
+        if r_prev is not None:
+            dr = r - r_prev
+            if np.dot(dr, dr) > 0:
+                omega = -omega * np.dot(r_prev, dr) / np.dot(dr, dr)
+
+        if verbose:
+            print(
+                "Pass %d: e0 = %0.6f, CLdes = %0.6f, mpay Omega^3 = %0.3f g/s^3"
+                % (iteration, e0, CLdes, mO3)
+            )
+
+        x_prev, r_prev = x, r
+        x = x + omega * r
+        history.append(tuple(x))
+
+        if np.max(np.abs(r)) < tol:
+            converged = True
+            break
+
+    if verbose:
+        if converged:
+            print("Converged in %d passes" % iteration)
+        else:
+            print("Not converged after %d passes" % iteration)
+
+    return {
+        "opt_vars": opt_vars,
+        "mO3": mO3,
+        "success": success,
+        "e0": x_prev[0] if x_prev is not None else e0,
+        "CLdes": x_prev[1] if x_prev is not None else CLdes,
+        "converged": converged,
+        "iterations": iteration,
+        "history": history,
+    }
+
+
 if __name__ == "__main__":
-    CLdes = CL_DES_INITIAL
-    e0 = 1.0
-
-    for i in range(10):
-        opt_vars_maxmO3, mO3_max, success = opt_mO3(e0, CLdes)
-        max_uefc = get_specified_uefc(e0, CLdes)
-        CL = max_uefc.lift_coefficient(
-            opt_vars_maxmO3[:3], opt_vars_maxmO3[3], opt_vars_maxmO3[4]
-        )
-        print("MPayO3 Optimizer Outut:")
-        print("Aspect ratio: %0.4f" % opt_vars_maxmO3[3])
-        print("Wing area:    %0.4f m^2" % opt_vars_maxmO3[4])
-        print("CL:    %f m^2" % CL)
-        print("Load factor:  %0.3f" % opt_vars_maxmO3[0])
-        print("Turn radius:  %0.2f m" % opt_vars_maxmO3[1])
-        print("Payload mass: %0.0f g" % opt_vars_maxmO3[2])
-
-        print(opt_vars_maxmO3)
-        print("mpay Omega^3: %0.0f g/s^3" % mO3_max)
-        print("")
-        print("")
-
-        CLdes, e0 = opt_vlm(max_uefc, opt_vars_maxmO3[3], opt_vars_maxmO3[4], CL)
-        print("VLM Optimizer Output:")
-        print("CL  = {:.2f}".format(CLdes))  # Maximum 2D lift coefficient
-        print("e0     = {:.2f}".format(e0))  # Span efficiency in level flight
-        print("")
-        print("")
+    result = coupled_solve()
+
+    opt_vars_maxmO3 = result["opt_vars"]
+    max_uefc = get_specified_uefc(result["e0"], result["CLdes"])
+    CL = max_uefc.lift_coefficient(
+        opt_vars_maxmO3[:3], opt_vars_maxmO3[3], opt_vars_maxmO3[4]
+    )
+    print("")
+    print("MPayO3 Optimizer Outut:")
+    print("Aspect ratio: %0.4f" % opt_vars_maxmO3[3])
+    print("Wing area:    %0.4f m^2" % opt_vars_maxmO3[4])
+    print("CL:    %f m^2" % CL)
+    print("Load factor:  %0.3f" % opt_vars_maxmO3[0])
+    print("Turn radius:  %0.2f m" % opt_vars_maxmO3[1])
+    print("Payload mass: %0.0f g" % opt_vars_maxmO3[2])
+
+    print(opt_vars_maxmO3)
+    print("mpay Omega^3: %0.0f g/s^3" % result["mO3"])
+    print("")
+    print("VLM Optimizer Output:")
+    print("CL  = {:.2f}".format(result["CLdes"]))  # Maximum 2D lift coefficient
+    print("e0     = {:.2f}".format(result["e0"]))  # Span efficiency in level flight
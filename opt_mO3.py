@@ -2,8 +2,28 @@ import numpy as np
 from scipy.optimize import minimize
 from GetUEFC        import UEFC
 from calc_mO3       import calc_mO3
+from opt_cache      import design_key
 
-def opt_mO3(UEFC, AR, S):
+# Default initial guess and bounds of the optimization variables
+N_initialGuess = 1.1
+N_lowerBound   = 1.0001
+N_upperBound   = 5.0
+
+R_initialGuess = 6.0
+R_lowerBound   = 0.1
+R_upperBound   = 12.5    
+
+mpay_initialGuess = 10.
+mpay_lowerBound   = 0.01
+mpay_upperBound   = 1000.
+
+INITIAL_GUESS = (N_initialGuess, R_initialGuess, mpay_initialGuess)
+BOUNDS        = ((N_lowerBound,    N_upperBound), 
+                 (R_lowerBound,    R_upperBound),
+                 (mpay_lowerBound, mpay_upperBound))
+
+def opt_mO3(UEFC, AR, S, initialGuess=None, full_output=False, nstarts=1, 
+            cache=None, check_feasibility=True):
     
     # YOU SHOULD NOT NEED TO CHANGE THIS FUNCTION FOR THIS PROBLEM
     
@@ -12,28 +32,75 @@ def opt_mO3(UEFC, AR, S):
     
     # Optimization variables: N, R, and mpay
     
+    # initialGuess: optional (N, R, mpay) starting point, e.g. the optimum of
+    # a neighbouring (AR, S) design. Defaults to the fixed guess below.
+    # full_output:  if True, also return a dict with the optimizer's 
+    # iteration ("nit"), function evaluation ("nfev") and gradient 
+    # evaluation ("njev") counts, and a "status" that is "optimal", 
+    # "infeasible" (no design satisfies the constraints; see 
+    # active_set_opt_mO3.feasibility_margin) or "failed" (there is a 
+    # feasible design, but SLSQP did not converge), and whether the result 
+    # came from the cache ("cached").
+    # check_feasibility: with full_output, tell "infeasible" from "failed" 
+    # when SLSQP fails and nstarts = 1 (a few ms per failure). If False, or 
+    # without full_output, the check is skipped and the status of such a 
+    # failure is None, e.g. for callers that only need the counts.
+    # nstarts:      if > 1, first run batch_opt_mO3 from initialGuess and 
+    # nstarts-1 random starts, and start SLSQP from the best of them. If 
+    # SLSQP then fails, the feasible batch result is returned (with the 
+    # batch status).
+    # cache:        optional opt_cache.OptCache. A result stored for the same 
+    # aircraft, (AR, S), solver settings and starting point is returned 
+    # without optimizing, and new results are stored. SLSQP is a local 
+    # method, so the result of a warm start is only returned to calls from 
+    # the same initialGuess, and never to cold starts (or the other way 
+    # round).
+    
     # Maximize objective: minimize negative of objective (ORIGINAL)
     #mO3_fcn = lambda opt_vars: -calc_mO3(UEFC, opt_vars, AR, S) 
     
     # Modification (otherwise solution not always found)
     mO3_fcn = lambda opt_vars: -calc_mO3(UEFC, opt_vars, AR, S)**(1./3.)
     
-    N_initialGuess = 1.1
-    N_lowerBound   = 1.0001
-    N_upperBound   = 5.0
-    
-    R_initialGuess = 6.0
-    R_lowerBound   = 0.1
-    R_upperBound   = 12.5    
-    
-    mpay_initialGuess = 10.
-    mpay_lowerBound   = 0.01
-    mpay_upperBound   = 1000.
-    
-    initialGuess = (N_initialGuess, R_initialGuess, mpay_initialGuess)
-    bounds       = ((N_lowerBound,    N_upperBound), 
-                    (R_lowerBound,    R_upperBound),
-                    (mpay_lowerBound, mpay_upperBound))
+    # Exact gradients (UEFC.gradients) are given to the optimizer for the 
+    # objective and all constraints, instead of finite differences
+    mO3_jac = lambda opt_vars: -(1./3.)*calc_mO3(UEFC, opt_vars, AR, S)**(-2./3.) \
+                               *UEFC.gradients(opt_vars, AR, S)["mO3"][:3]
+    
+    warm_start = initialGuess is not None
+    if initialGuess is None:
+        initialGuess = INITIAL_GUESS
+    bounds = BOUNDS
+    maxiter = 400
+    
+    if cache is not None:
+        settings = {"solver":  "opt_mO3", 
+                    "bounds":  bounds, 
+                    "maxiter": maxiter, 
+                    "nstarts": nstarts,
+                    "warm_start":   warm_start,
+                    "initialGuess": [float(x) for x in initialGuess]}
+        key    = design_key(UEFC, AR, S, settings)
+        stored = cache.get(key)
+        if stored is not None:
+            if full_output:
+                info = dict(stored["info"], cached=True)
+                if info["status"] is None and check_feasibility:
+                    info["status"] = failure_status(UEFC, AR, S)
+                return stored["opt_vars"], stored["mO3"], stored["success"], \
+                       info
+            return stored["opt_vars"], stored["mO3"], stored["success"]
+    
+    status     = None
+    batch_vars = None  # Feasible batch_opt_mO3 result, if any
+    if nstarts > 1:
+        from batch_opt_mO3 import batch_opt_mO3
+        
+        opt_vars, _, _, status = batch_opt_mO3(UEFC, AR, S, initialGuess, 
+                                               nstarts=nstarts)
+        status = str(status)
+        if status != "infeasible":
+            initialGuess = batch_vars = opt_vars
     
     # Constraint format is different, depending on algorithm.
     method = "SLSQP"
@@ -42,21 +109,27 @@ def opt_mO3(UEFC, AR, S):
         # Excess thrust (max - required thrust) must be positive.
         T_constraint = {
                 "type": "ineq",
-                "fun":  lambda opt_vars: UEFC.excess_thrust(opt_vars, AR, S)
+                "fun":  lambda opt_vars: UEFC.excess_thrust(opt_vars, AR, S),
+                "jac":  lambda opt_vars: 
+                    UEFC.gradients(opt_vars, AR, S)["Excess thrust"][:3]
                 }
     
         # Wingtip deflection must be less than the maximum allowed value.
         db_constraint = {
                 "type": "ineq",
                 "fun":  lambda opt_vars: UEFC.dbmax \
-                - UEFC.wing_tip_deflection(opt_vars, AR, S)
+                - UEFC.wing_tip_deflection(opt_vars, AR, S),
+                "jac":  lambda opt_vars: 
+                    -UEFC.gradients(opt_vars, AR, S)["Tip deflection"][:3]
                 }
     
         # Lift coefficient must be less than the maximum allowed cruise value. 
         CL_constraint = {
                 "type": "ineq",
                 "fun": lambda opt_vars: UEFC.CLdes \
-                - UEFC.lift_coefficient(opt_vars, AR, S)
+                - UEFC.lift_coefficient(opt_vars, AR, S),
+                "jac":  lambda opt_vars: 
+                    -UEFC.gradients(opt_vars, AR, S)["Lift coefficient"][:3]
             }
 
     else:
@@ -65,28 +138,67 @@ def opt_mO3(UEFC, AR, S):
     
     constraints = [T_constraint, db_constraint, CL_constraint]
     
-    try:
-        result = minimize(fun=mO3_fcn, x0=initialGuess, bounds=bounds, 
-                      constraints=constraints, method=method, 
-                      options={"maxiter": 400})
+    # Share each design point's intermediate quantities between the 
+    # objective and all constraints
+    with UEFC.evaluation_context():
+        try:
+            result = minimize(fun=mO3_fcn, x0=initialGuess, jac=mO3_jac, 
+                          bounds=bounds, constraints=constraints, 
+                          method=method, options={"maxiter": maxiter})
+            
+            success = result.success
         
-        success = result.success
-    
-    except:  # Optimizer failed
-        result  = None
-        success = False
+        except:  # Optimizer failed
+            result  = None
+            success = False
     
     if success:
         opt_vars_maxObj = result.x  # Variables that maximize objective
         mO3_max         = calc_mO3(UEFC, opt_vars_maxObj, AR, S)
     
+    elif batch_vars is not None:  # Keep the best feasible batch result
+        opt_vars_maxObj = batch_vars
+        mO3_max         = calc_mO3(UEFC, batch_vars, AR, S)
+    
     else:  # If optimizer fails
         opt_vars_maxObj = np.zeros(np.size(initialGuess))
         mO3_max         = 0
     
+    if success:
+        status = "optimal"
+    elif batch_vars is not None:
+        success = True  # status is that of batch_opt_mO3
+    elif status is None:
+        if full_output and check_feasibility:
+            status = failure_status(UEFC, AR, S)
+    
+    info = {
+            "nit":  result.nit  if result is not None else 0,
+            "nfev": result.nfev if result is not None else 0,
+            "njev": result.njev if result is not None else 0,
+            "status": status,
+            "cached": False,
+            }
+    
+    if cache is not None:
+        cache.put(key, UEFC, AR, S, opt_vars_maxObj, mO3_max, success, info)
+    
+    if full_output:
+        return opt_vars_maxObj, mO3_max, success, info
+    
     return opt_vars_maxObj, mO3_max, success
 
 
+def failure_status(UEFC, AR, S):
+    
+    # Status of an SLSQP failure at (AR, S): SLSQP does not tell an 
+    # infeasible problem from a failure to converge, so check for a feasible
+    # design directly (see active_set_opt_mO3.feasibility_margin)
+    from active_set_opt_mO3 import feasibility_margin
+    
+    return "failed" if feasibility_margin(UEFC, AR, S) >= 0 else "infeasible"
+
+
 if __name__ == "__main__":
     
     # Simple test case. Feel free to modify this part of the file.
@@ -0,0 +1,238 @@
+# Outer-loop parametric study over UEFC constructor parameters (tau, taper,
+# dbmax, CLdes, ...). For each set of parameters the aircraft is optimized
+# over (AR, S) as well, either by the coupled (mO3, VLM) solve of 
+# opt_m03_legit (AR and S are optimization variables) or by a scan_ARS grid 
+# scan, and the best design is kept. Parameters not given take the defaults 
+# of the UEFC constructor for both inner problems.
+#
+# Cases are run on a process pool and every finished case is appended to a
+# JSON-lines file at once, so an interrupted study is resumed by running it
+# again with the same file: cases already in the file are not recomputed.
+
+import os
+import json
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from GetUEFC    import UEFC
+from scan_ARS   import scan_grid
+from opt_cache  import aircraft_parameters
+from results_io import save_results
+import opt_m03_legit
+
+# Outputs stored for each case, after its parameters
+RECORD_FIELDS = ("success", "mO3", "AR", "S", "N", "R", "mpay")
+
+# Default (AR, S) grid of the scan_ARS inner problem
+AR_ARRAY = np.linspace(5,   15,  25)
+S_ARRAY  = np.linspace(0.1, 0.7, 25)
+
+INNER_PROBLEMS = ("opt_m03_legit", "scan_ARS")
+
+
+def cartesian_grid(**values):
+
+    # All combinations of the given parameter values, e.g.
+    # cartesian_grid(tau=[0.08, 0.1], taper=[0.4, 0.7, 1.0]) -> 6 cases
+    names = list(values)
+    return [dict(zip(names, map(float, combination)))
+            for combination in itertools.product(*values.values())]
+
+
+def latin_hypercube(nsamples, seed=0, **ranges):
+
+    # nsamples Latin hypercube samples of the parameters over the given
+    # (lower, upper) ranges, e.g. latin_hypercube(50, tau=(0.08, 0.12)): each
+    # parameter range is divided into nsamples strata, sampled once each.
+    rng   = np.random.default_rng(seed)
+    names = list(ranges)
+
+    strata  = np.array([rng.permutation(nsamples) for name in names]).T
+    samples = (strata + rng.uniform(size=strata.shape))/nsamples
+
+    lower, upper = np.array([ranges[name] for name in names], dtype=float).T
+    samples = lower + samples*(upper - lower)
+
+    return [dict(zip(names, map(float, sample))) for sample in samples]
+
+
+def case_key(params, inner):
+
+    # Identifies a case in the results file
+    return json.dumps([inner, params], sort_keys=True)
+
+
+def run_case(params, inner, ARarray=AR_ARRAY, Sarray=S_ARRAY, cache=None):
+
+    # Optimize the aircraft UEFC(**params) over (AR, S) and its operating
+    # point. For "opt_m03_legit", e0 and CLdes are the starting point of
+    # the coupled solve, and the aircraft optimized has the converged ones
+    # (success requires convergence). Returns a JSON-serializable record,
+    # with every constant of the aircraft optimized in "aircraft".
+    aircraft = aircraft_parameters(UEFC(**params))
+
+    if inner == "opt_m03_legit":
+        other  = dict(aircraft)
+        e0     = other.pop("e0")
+        CLdes  = other.pop("CLdes")
+
+        result = opt_m03_legit.coupled_solve(e0, CLdes, verbose=False,
+                                             **other)
+        opt_vars = result["opt_vars"]
+        if opt_vars is None:  # First SLSQP run failed
+            opt_vars = np.zeros(5)
+
+        mO3     = result["mO3"]
+        success = result["success"] and result["converged"]
+        N, R, mpay, AR, S = opt_vars
+        aircraft.update(e0=float(result["e0"]), CLdes=float(result["CLdes"]))
+
+    elif inner == "scan_ARS":
+        result = scan_grid(UEFC(**aircraft), ARarray, Sarray, workers=1,
+                           verbose=False, cache=cache)
+
+        (iAR, iS) = np.unravel_index(result["mO3"].argmax(),
+                                     result["mO3"].shape)
+        best = result[iAR,iS]
+
+        mO3     = best["mO3"]
+        success = mO3 > 0
+        N, R, mpay = best["N"], best["R"], best["mpay"]
+        AR, S      = ARarray[iAR], Sarray[iS]
+
+    else:
+        raise ValueError("Inner problem " + str(inner) + " not recognized; "
+                         "use one of " + ", ".join(INNER_PROBLEMS))
+
+    return {"parameters": params,
+            "aircraft":   aircraft,
+            "inner":      inner,
+            "success":    bool(success),
+            "mO3":        float(mO3),
+            "AR":         float(AR),
+            "S":          float(S),
+            "N":          float(N),
+            "R":          float(R),
+            "mpay":       float(mpay)}
+
+
+def load_study(path):
+
+    # Records stored in a results file, by case_key of their parameters and
+    # inner problem. A line cut short by an interruption is ignored, and so 
+    # is a record without "aircraft" (written before the full parameter set 
+    # was stored, when opt_m03_legit used its own defaults), so that its 
+    # case is run again.
+    records = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "aircraft" not in record:
+                    continue
+                records[case_key(record["parameters"],
+                                 record["inner"])] = record
+
+    return records
+
+
+def parametric_study(param_grid, inner="opt_m03_legit", workers=None,
+                     path="parametric_study.jsonl", ARarray=AR_ARRAY,
+                     Sarray=S_ARRAY, cache=None, verbose=True):
+
+    # Run the inner problem ("opt_m03_legit" or "scan_ARS") for every set of
+    # UEFC constructor parameters in param_grid (a list of dicts, e.g. from
+    # cartesian_grid or latin_hypercube), on a pool of worker processes
+    # (workers=None uses all cores; workers=1 runs serially in this process).
+    #
+    # Each finished case is appended to the JSON-lines file path. Cases with
+    # a record for the same inner problem already in the file are skipped, so
+    # a study is resumed or extended by calling it again with the same path.
+    # ARarray, Sarray and cache (an opt_cache.OptCache) are used by the
+    # scan_ARS inner problem only.
+    #
+    # Returns the records of all cases, in the order of param_grid.
+    if inner not in INNER_PROBLEMS:
+        raise ValueError("Inner problem " + str(inner) + " not recognized; "
+                         "use one of " + ", ".join(INNER_PROBLEMS))
+    if workers is None:
+        workers = os.cpu_count()
+
+    params  = [{name: float(value) for name, value in case.items()}
+               for case in param_grid]
+    records = load_study(path)
+    todo    = [case for case in params
+               if case_key(case, inner) not in records]
+
+    if verbose and len(todo) < len(params):
+        print("Resuming: %d of %d cases already in %s"
+              % (len(params) - len(todo), len(params), path))
+
+    with open(path, "a+") as f:
+
+        # Terminate a line cut short by an interruption
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(f.tell() - 1)
+            if f.read(1) != "\n":
+                f.write("\n")
+
+        def store(record, ndone):
+            records[case_key(record["parameters"], inner)] = record
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            if verbose:
+                print("Completed %d of %d cases" % (ndone, len(todo)))
+
+        if workers == 1:
+            for ndone, case in enumerate(todo, 1):
+                store(run_case(case, inner, ARarray, Sarray, cache), ndone)
+
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(run_case, case, inner, ARarray,
+                                           Sarray, cache)
+                           for case in todo]
+                for ndone, future in enumerate(as_completed(futures), 1):
+                    store(future.result(), ndone)
+
+    return [records[case_key(case, inner)] for case in params]
+
+
+def save_study(path, records):
+
+    # Save study records (as returned by parametric_study) to the columnar 
+    # .npz file path: one column per constant of the aircraft optimized and 
+    # per RECORD_FIELDS, e.g. for 
+    # results_io.to_grid(load_results(path), "tau", "taper", "mO3")
+    names = sorted({name for record in records 
+                    for name in record["aircraft"]})
+    
+    columns = {name: [record["aircraft"].get(name, np.nan) 
+                      for record in records] for name in names}
+    columns.update({field: [record[field] for record in records] 
+                    for field in RECORD_FIELDS})
+    
+    save_results(path, columns)
+
+
+if __name__ == "__main__":
+
+    # The (tau, taper) study of Q4-Q6. Feel free to modify this part of the
+    # file.
+    param_grid = cartesian_grid(tau=np.linspace(0.08, 0.12, 15),
+                                taper=np.linspace(0.4, 1.0, 15))
+
+    records = parametric_study(param_grid, inner="scan_ARS")
+    save_study("parametric_study.npz", records)
+
+    best = max(records, key=lambda record: record["mO3"])
+    print()
+    print("Best design: " + ", ".join("%s = %0.4f" % item
+                                      for item in best["parameters"].items()))
+    print("AR = %0.4f, S = %0.4f m^2, mpay Omega^3 = %0.0f g/s^3"
+          % (best["AR"], best["S"], best["mO3"]))
@@ -0,0 +1,110 @@
+# Plots of UEFC_wing solutions and of scan_ARS results. matplotlib is only
+# imported when one of these functions is called, so that the numerical modules
+# (GetUEFC, opt_mO3, UEFC_wing, scan_ARS, ...) load with NumPy and SciPy only:
+# worker processes, batch jobs and headless servers never import it.
+
+import numpy as np
+
+# Contours of plot_scan: field of the scan_grid result, title, number of
+# levels and label font size
+SCAN_CONTOURS = (("mO3",   "mO3 (g/s^3)",              21, 7.0),
+                 ("mpay",  "Payload mass (g)",          21, 8.0),
+                 ("Omega", "Turn rate (rad/s)",         21, 8.0),
+                 ("R",     "Turn radius (m)",           21, 8.0),
+                 ("db",    "Wing Tip Deflection (-)",   11, 8.0),
+                 ("CL",    "Lift coefficient (-)",      11, None),
+                 ("T",     "Thrust (N)",                11, 7.0),
+                 ("Tmax",  "Maximum Thrust (N)",        11, 7.0))
+
+
+def plot_geometry(wing):
+
+    # Planform, front view and geometric twist of a UEFC_wing
+    import matplotlib.pyplot as plt
+
+    fig, axs = plt.subplots(3,1,sharex=True)
+    axs_p = axs[0] # planform plot
+    axs_f = axs[1] # front plot
+    axs_g = axs[2] # geometric twist
+
+    pans = wing.panels
+    for XLEa, XLEb, ca, cb, aga, agb in zip(pans.XLEa, pans.XLEb, pans.ca, pans.cb, pans.aga, pans.agb):
+        axs_p.plot([XLEa[1],XLEb[1],XLEb[1],XLEa[1],XLEa[1]],[XLEa[0],XLEb[0],XLEb[0]+cb,XLEa[0]+ca,XLEa[0]],color='black')
+
+        axs_f.plot([XLEa[1],XLEb[1]],[XLEa[2],XLEb[2]],color='black')
+
+        axs_g.plot([XLEa[1],XLEb[1]],[aga, agb],color='black')
+
+    axs_p.axis('equal')
+    axs_p.set_ylabel('$x$')
+    axs_f.axis('equal')
+    axs_f.set_ylabel('$z$')
+    axs_g.set_ylabel(r'$\alpha_g$')
+    axs_g.set_xlabel('$y$')
+    axs_p.set_title('$S =$ {:.3f}, $AR =$ {:.2f}'.format(wing.get_S(),wing.get_AR()))
+
+    return (fig, axs)
+
+
+def plot_cl(wing, G, plotclccbar=False):
+
+    # Spanwise cl distribution of the UEFC_wing solution G, and optionally the
+    # load distribution cl c/cbar
+    import matplotlib.pyplot as plt
+
+    cl, y = wing.calccldist(G)
+    fig, axs = plt.subplots(1,1,sharex=True)
+    axs.plot(2*y/wing.b,cl,'r-',label='$c_l$')
+    if plotclccbar:
+        cbar = wing.get_S()/wing.b
+        clccbar = 2*G/cbar
+        axs.plot(2*y/wing.b,clccbar,'b-',label=r'$c_l\, c/\overline{c}$')
+
+    clmax = max(cl)
+    CL, CDi, e0, clmax0 = wing.calc_aeroperf(G)
+    axs.set_title('$C_L =$ {:.2f}, $max(c_l) =$ {:.2f}, $CDi =$ {:.4f}, $e_0 =$ {:.2f}'.format(CL,clmax,CDi,e0))
+    axs.set_xlabel('$y/(b/2)$')
+    axs.grid(True)
+    axs.legend()
+
+    return (fig, axs)
+
+
+def plot_scan(ARarray, Sarray, result, fields=None):
+
+    # Contours over (AR, S) of the fields of a scan_grid result (by default
+    # all of SCAN_CONTOURS), with an asterisk at the maximum mO3. The maximum
+    # thrust uses the levels of the thrust, so that the two can be compared.
+    # Returns the list of figures; call matplotlib.pyplot.show() to display
+    # them.
+    import matplotlib.pyplot as plt
+
+    plt.rc('axes', axisbelow=True)
+    marker = (8,2,0)  # 8-sided asterisk
+
+    ARvals, Svals = np.meshgrid(ARarray, Sarray, indexing="ij")
+    iopt  = np.unravel_index(result["mO3"].argmax(), result["mO3"].shape)
+    ARopt = ARvals[iopt]
+    Sopt  = Svals[iopt]
+
+    figures = []
+    for field, title, nlevels, fontsize in SCAN_CONTOURS:
+        if fields is not None and field not in fields:
+            continue
+
+        values = result["T" if field == "Tmax" else field]
+        levels = np.linspace(np.min(values[values > 0]), np.max(values),
+                             nlevels)
+
+        figures.append(plt.figure(figsize=(4, 3.5), dpi=150))
+        cs = plt.contour(ARvals, Svals, result[field], levels=levels,
+                         linewidths=0.5)
+        plt.clabel(cs, colors="black", fontsize=fontsize)
+        plt.plot(ARopt, Sopt, marker=marker, color="red", markersize=20)
+        plt.grid()
+        plt.xlabel("Aspect ratio (-)")
+        plt.ylabel("Wing area ($m^2$)")
+        plt.title(title)
+        plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92)
+
+    return figures
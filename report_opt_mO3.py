@@ -2,13 +2,24 @@
 from GetUEFC import UEFC
 from opt_mO3 import opt_mO3
 
-def report_opt_mO3(UEFC, AR, S):
+def report_opt_mO3(UEFC, AR, S, cache=None):
     
     # This function is a wrapper for opt_mO3. Calling it will print out the 
     # optimized performance, operating conditions, etc found after running 
     # opt_mO3.  It calls opt_mO3 and then prints out useful information.
+    # cache: optional opt_cache.OptCache, passed on to opt_mO3.
     
-    opt_vars, mO3, success = opt_mO3(UEFC, AR, S)
+    # The report reuses the quantities memoized at the optimum
+    with UEFC.evaluation_context():
+        opt_vars, mO3, success = opt_mO3(UEFC, AR, S, cache=cache)
+        print_report(UEFC, AR, S, opt_vars, mO3, success)
+    
+    return
+
+
+def print_report(UEFC, AR, S, opt_vars, mO3, success):
+    
+    # Print the report for an opt_mO3 result
     
     if success:
         
@@ -0,0 +1,61 @@
+# Columnar storage of study results: one NumPy array (column) per input and
+# output quantity, one row per design, saved as an .npz file.
+
+import json
+import numpy as np
+
+
+def save_results(path, columns):
+
+    # Save a dict of equal-length 1D columns, e.g. {"tau": ..., "taper": ...,
+    # "mO3": ...}, to the .npz file path
+    columns = {name: np.asarray(column) for name, column in columns.items()}
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("Columns of different lengths: " +
+                         ", ".join("%s (%d)" % (name, len(column))
+                                   for name, column in columns.items()))
+
+    np.savez(path, **columns)
+
+
+def load_results(path):
+
+    # Columns saved by save_results, as a dict of arrays
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def load_legacy_json(path):
+
+    # Columns (AR, S, tau, taper, mO3) of the JSON files written for Q4-Q6
+    # (Q4_5_6/Optimal_ARS_*.txt), whose keys are the mO3 values and whose
+    # values are lists of [AR, S, tau, taper] designs with that mO3.
+    with open(path) as f:
+        data = json.load(f)
+
+    rows = [(*design, float(mO3)) for mO3, designs in data.items()
+            for design in designs]
+    AR, S, tau, taper, mO3 = np.array(rows, dtype=np.float64).T
+
+    return {"AR": AR, "S": S, "tau": tau, "taper": taper, "mO3": mO3}
+
+
+def to_grid(columns, x, y, *names, decimals=10, fill=np.nan):
+
+    # Arrange the rows of a study over a grid of (x, y) values, e.g.
+    # tau, taper, mO3 = to_grid(columns, "tau", "taper", "mO3"). Returns the
+    # distinct x and y values (rounded to decimals, so that round-off does not
+    # split a grid line) and, for each of names, a 2D array Z with the value
+    # at (x[i], y[j]) in Z[i,j]. Cells without a row are set to fill; for
+    # repeated (x, y) rows the last one is kept.
+    xvals, ix = np.unique(np.round(columns[x], decimals), return_inverse=True)
+    yvals, iy = np.unique(np.round(columns[y], decimals), return_inverse=True)
+
+    grids = []
+    for name in names:
+        Z = np.full((len(xvals), len(yvals)), fill, dtype=np.float64)
+        Z[ix,iy] = columns[name]
+        grids.append(Z)
+
+    return (xvals, yvals) + tuple(grids)
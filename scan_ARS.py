@@ -7,13 +7,350 @@
 # performance, operating conditions, weight breakdowns, etc are for this 
 # optimized aircraft.
 
+import os
 import numpy as np
-from matplotlib import pyplot as plt
-from IPython    import get_ipython
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from GetUEFC        import UEFC
 from opt_mO3        import opt_mO3
 from report_opt_mO3 import report_opt_mO3
+from results_io     import save_results
+from opt_cache      import aircraft_parameters
+
+# Quantities stored for each (AR, S) point by scan_grid
+SCAN_FIELDS = ("mO3",    # Objective function (g/s^3)
+               "mpay",   # Payload mass (g)
+               "Omega",  # Turn rate (rad/s)
+               "R",      # Turn radius (m)
+               "CL",     # Lift coefficient (-)
+               "T",      # Required thrust (N)
+               "Tmax",   # Maximum thrust (N)
+               "db",     # Wingtip deflection / wingspan
+               "N")      # load factor
+
+# Optimizer statistics stored alongside SCAN_FIELDS
+SCAN_STATS = ("nit",     # SLSQP iterations
+              "nfev")    # Objective function evaluations
+
+SCAN_DTYPE = np.dtype([(field, np.float64) for field in SCAN_FIELDS] + 
+                      [(field, np.int64)   for field in SCAN_STATS])
+
+# Refinement settings of scan_adaptive
+OPTIMUM_TOL   = 0.05  # Refine cells with an mO3 within this fraction of the best
+CURVATURE_TOL = 0.02  # Refine where second differences of mO3 exceed this 
+                      # fraction of the best mO3
+MIN_CELLS     = 4     # Minimum number of coarse cells along AR and along S
+
+# AR rows per chunk of a continuation scan_grid, so that the serpentine walk 
+# warm-starts across rows
+CONTINUATION_ROWS = 4
+
+
+def scan_point(aircraft, AR, S, initialGuess=None, cache=None):
+    
+    # Determine max objective at a single (AR, S) point. Returns the 
+    # SCAN_FIELDS and SCAN_STATS values for it (fields are all zero if the 
+    # optimizer fails) and the optimal opt_vars (None on failure). cache is 
+    # an optional opt_cache.OptCache consulted by opt_mO3.
+    opt_vars, mO3, success, info = opt_mO3(aircraft, AR, S, initialGuess, 
+                                           full_output=True, cache=cache, 
+                                           check_feasibility=False)
+    stats = (info["nit"], info["nfev"])
+    
+    if not success and initialGuess is not None:
+        # Warm start failed: fall back to the default initial guess
+        opt_vars, mO3, success, info = opt_mO3(aircraft, AR, S, 
+                                               full_output=True, cache=cache,
+                                               check_feasibility=False)
+        stats = (stats[0] + info["nit"], stats[1] + info["nfev"])
+    
+    if not success:
+        return (0.,)*len(SCAN_FIELDS) + stats, None
+    
+    V = aircraft.flight_velocity(opt_vars, AR, S)
+    
+    return (mO3,
+            opt_vars[2],
+            aircraft.turn_rate(opt_vars, AR, S),
+            opt_vars[1],
+            aircraft.lift_coefficient(opt_vars, AR, S),
+            aircraft.required_thrust(opt_vars, AR, S),
+            aircraft.maximum_thrust(V),
+            aircraft.wing_tip_deflection(opt_vars, AR, S),
+            opt_vars[0]) + stats, opt_vars
+
+
+def scan_chunk(aircraft, points, continuation=False, cache=None):
+    
+    # Run scan_point over a list of (iAR, iS, AR, S) grid points. This is the
+    # unit of work sent to each worker process by scan_grid.
+    #
+    # With continuation=True each optimization is started from the optimum 
+    # of the nearest adjacent (in grid index) point of this chunk solved 
+    # successfully so far, so the points should be ordered as a walk over 
+    # the grid. Points with no converged neighbour use the default guess, 
+    # and so do points next to one that failed: near the feasibility 
+    # boundary a warm start mostly fails, and then costs a second, default 
+    # start.
+    solved = {}     # (iAR, iS) -> optimal opt_vars
+    failed = set()  # (iAR, iS) of the points with no feasible optimum
+    chunk_result = []
+    with aircraft.evaluation_context():
+        for iAR, iS, AR, S in points:
+            initialGuess = None
+            if continuation and not any(abs(ij[0]-iAR) <= 1 and 
+                                        abs(ij[1]-iS) <= 1 for ij in failed):
+                neighbours = [ij for ij in solved 
+                              if abs(ij[0]-iAR) <= 1 and abs(ij[1]-iS) <= 1]
+                if neighbours:
+                    nearest = min(neighbours, 
+                                  key=lambda ij: (ij[0]-iAR)**2 + (ij[1]-iS)**2)
+                    initialGuess = solved[nearest]
+            
+            values, opt_vars = scan_point(aircraft, AR, S, initialGuess, cache)
+            if opt_vars is not None:
+                solved[(iAR, iS)] = opt_vars
+            else:
+                failed.add((iAR, iS))
+            chunk_result.append((iAR, iS, values))
+    
+    return chunk_result
+
+
+def scan_grid(aircraft, ARarray, Sarray, workers=None, chunksize=None, 
+              continuation=False, verbose=True, cache=None):
+    
+    # Determine optimal designs over the (AR, S) grid. Grid points are 
+    # distributed over a process pool in chunks of chunksize points (default: 
+    # one AR row, or CONTINUATION_ROWS rows with continuation). workers=None 
+    # uses all cores; workers=1 runs serially in this process. Returns a 
+    # structured array of shape (nAR, nS) with fields SCAN_FIELDS and 
+    # SCAN_STATS, e.g. result["mO3"][iAR,iS].
+    #
+    # continuation=True walks the grid in serpentine order (S ascending for 
+    # even iAR, descending for odd iAR) and warm-starts each optimization 
+    # from its nearest converged neighbour within the same chunk, which 
+    # includes the previous AR row except at the start of a chunk; compare 
+    # result["nfev"] against a default scan to measure the saving.
+    #
+    # cache: optional opt_cache.OptCache. Points already stored in it are not
+    # optimized again, so re-running or extending a scan only costs the new 
+    # points (the stored nit/nfev are those of the original optimization).
+    nAR = len(ARarray)
+    nS  = len(Sarray)
+    
+    if workers is None:
+        workers = os.cpu_count()
+    if chunksize is None:
+        chunksize = nS*(CONTINUATION_ROWS if continuation else 1)
+    
+    points = []
+    for iAR, AR in enumerate(ARarray):
+        iSs = range(nS)
+        if continuation and iAR % 2 == 1:
+            iSs = reversed(iSs)
+        points += [(iAR, iS, AR, Sarray[iS]) for iS in iSs]
+    
+    result = np.zeros((nAR, nS), dtype=SCAN_DTYPE)
+    for iAR, iS, values in scan_points(aircraft, points, workers, chunksize, 
+                                       continuation, verbose, cache):
+        result[iAR,iS] = values
+    
+    return result
+
+
+def scan_points(aircraft, points, workers, chunksize, continuation=False, 
+                verbose=True, cache=None):
+    
+    # Run scan_point over a list of (iAR, iS, AR, S) points, in chunks of 
+    # chunksize points on a pool of workers processes (workers=1 runs 
+    # serially in this process). Returns the list of (iAR, iS, values), in 
+    # order of completion.
+    chunks = [points[i:i+chunksize] for i in range(0, len(points), chunksize)]
+    
+    done = []
+    def store(chunk_result):
+        done.extend(chunk_result)
+        if verbose:
+            print("Completed %3.1f%% of (AR,S) scan" 
+                  % (100*len(done)/len(points)))
+    
+    if workers == 1:
+        for chunk in chunks:
+            store(scan_chunk(aircraft, chunk, continuation, cache))
+    
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(scan_chunk, aircraft, chunk, 
+                                       continuation, cache)
+                       for chunk in chunks]
+            for future in as_completed(futures):
+                store(future.result())
+    
+    return done
+
+
+def scan_adaptive(aircraft, ARarray, Sarray, step=None, workers=None, 
+                  chunksize=None, optimum_tol=OPTIMUM_TOL, 
+                  curvature_tol=CURVATURE_TOL, verbose=True, cache=None):
+    
+    # Adaptive alternative to scan_grid over the same (AR, S) grid. The scan 
+    # starts with every step-th point of the grid (step is a power of 2 that 
+    # divides len(ARarray)-1 and len(Sarray)-1; by default the largest one 
+    # leaving MIN_CELLS cells along each axis), and then splits cells in four 
+    # (a quadtree), halving step, until step = 1. A cell is split when:
+    #   - it crosses the feasibility boundary (mO3 = 0 at some corners only,
+    #     or at some points sampled on its edges by split neighbours),
+    #   - its best corner is within optimum_tol of the best mO3 found so far,
+    #   - or the second difference of mO3 at one of its corners, along AR or
+    #     S, exceeds curvature_tol times the best mO3 (so that the linear 
+    #     interpolation of the cell is not accurate).
+    # The new points of each level are optimized together on the pool of 
+    # workers processes, as in scan_grid.
+    #
+    # Returns the scattered samples, as a dict of columns (AR, S, SCAN_FIELDS 
+    # and SCAN_STATS; see results_io.save_results), and the scan_grid result
+    # over the full grid, with the unsampled points bilinearly interpolated 
+    # in their quadtree cell (their SCAN_STATS are zero), e.g. for 
+    # plotting.plot_scan.
+    nAR = len(ARarray)
+    nS  = len(Sarray)
+    
+    if workers is None:
+        workers = os.cpu_count()
+    if step is None:
+        step = 1
+        while (nAR-1) % (2*step) == 0 and (nS-1) % (2*step) == 0 and \
+              min(nAR-1, nS-1)//(2*step) >= MIN_CELLS:
+            step *= 2
+    elif step & (step-1) or (nAR-1) % step or (nS-1) % step:
+        raise ValueError("step must be a power of 2 dividing len(ARarray)-1 "
+                         "and len(Sarray)-1")
+    
+    samples = {}  # (iAR, iS) -> SCAN_FIELDS + SCAN_STATS values
+    
+    def evaluate(indices, spacing):
+        new = sorted(set(indices) - set(samples))
+        points = [(iAR, iS, ARarray[iAR], Sarray[iS]) for iAR, iS in new]
+        size = chunksize or max(1, -(-len(points)//(4*workers)))
+        if points:
+            for iAR, iS, values in scan_points(aircraft, points, workers, 
+                                               size, False, False, cache):
+                samples[(iAR,iS)] = values
+        if verbose:
+            print("Spacing %d: %d new points, %d in total" 
+                  % (spacing, len(points), len(samples)))
+    
+    def mO3(ij):
+        return samples[ij][0]
+    
+    def refine(iAR, iS, best):
+        corners = [(iAR, iS), (iAR+step, iS), (iAR, iS+step), 
+                   (iAR+step, iS+step)]
+        feasible = [mO3(corner) > 0 for corner in corners]
+        if not any(feasible):
+            return False
+        if not all(feasible):
+            return True
+        if max(map(mO3, corners)) >= (1 - optimum_tol)*best:
+            return True
+        
+        for i, j in corners:
+            for di, dj in ((step, 0), (0, step)):
+                neighbours = [(i-di, j-dj), (i+di, j+dj)]
+                if all(ij in samples and mO3(ij) > 0 for ij in neighbours):
+                    curvature = mO3(neighbours[0]) - 2*mO3((i, j)) \
+                                + mO3(neighbours[1])
+                    if abs(curvature) > curvature_tol*best:
+                        return True
+        return False
+    
+    def boundary(iAR, iS):
+        # True if the samples on the edges of the cell are not all feasible 
+        # or all infeasible (the corners, and the edge midpoints sampled by 
+        # split neighbours)
+        feasible = {mO3((iAR+di, iS+dj)) > 0 
+                    for di in (0, step//2, step) for dj in (0, step//2, step)
+                    if (iAR+di, iS+dj) in samples}
+        return len(feasible) > 1
+    
+    def split_points(split):
+        return [(iAR+di, iS+dj) for iAR, iS in split 
+                for di in (0, step//2, step) for dj in (0, step//2, step)]
+    
+    # Coarse grid, then one quadtree level per halving of step. A cell that 
+    # is not split is a leaf of the final quadtree.
+    cells = [(iAR, iS) for iAR in range(0, nAR-1, step) 
+                       for iS  in range(0, nS-1,  step)]
+    leaves = []
+    evaluate([(iAR, iS) for iAR in range(0, nAR, step) 
+                        for iS  in range(0, nS,  step)], step)
+    
+    while step > 1:
+        best  = max(values[0] for values in samples.values())
+        split = {cell for cell in cells if refine(*cell, best)}
+        evaluate(split_points(split), step//2)
+        
+        # The feasibility boundary may run into a cell through the edge 
+        # shared with a split neighbour
+        while True:
+            more = {cell for cell in cells 
+                    if cell not in split and boundary(*cell)}
+            if not more:
+                break
+            split |= more
+            evaluate(split_points(more), step//2)
+        
+        leaves += [(iAR, iS, step) for iAR, iS in cells 
+                   if (iAR, iS) not in split]
+        half  = step//2
+        cells = [(iAR+di, iS+dj) for iAR, iS in sorted(split) 
+                 for di in (0, half) for dj in (0, half)]
+        step  = half
+    leaves += [(iAR, iS, step) for iAR, iS in cells]
+    
+    # Scattered samples
+    indices = np.array(sorted(samples))
+    sampled = np.array([tuple(samples[tuple(ij)]) for ij in indices], 
+                       dtype=SCAN_DTYPE)
+    columns = {"AR": np.asarray(ARarray)[indices[:,0]], 
+               "S":  np.asarray(Sarray)[indices[:,1]]}
+    columns.update({field: sampled[field] for field in SCAN_FIELDS + SCAN_STATS})
+    
+    # Bilinear interpolation (in grid indices) over each leaf from its 
+    # corners, the largest leaves first so that the edges they share with 
+    # smaller leaves take the values of the finer ones
+    result = np.zeros((nAR, nS), dtype=SCAN_DTYPE)
+    for iAR, iS, size in sorted(leaves, key=lambda leaf: -leaf[2]):
+        u = np.linspace(0, 1, size+1)[:,np.newaxis]
+        v = np.linspace(0, 1, size+1)[np.newaxis,:]
+        c00, c10 = samples[(iAR, iS)],      samples[(iAR+size, iS)]
+        c01, c11 = samples[(iAR, iS+size)], samples[(iAR+size, iS+size)]
+        block = result[iAR:iAR+size+1, iS:iS+size+1]
+        for k, field in enumerate(SCAN_FIELDS):
+            block[field] = (1-u)*(1-v)*c00[k] + u*(1-v)*c10[k] \
+                           + (1-u)*v*c01[k] + u*v*c11[k]
+    result[indices[:,0],indices[:,1]] = sampled
+    
+    return columns, result
+
+
+def save_scan(path, aircraft, ARarray, Sarray, result):
+    
+    # Save a scan_grid result to the columnar .npz file path: one row per 
+    # (AR, S) point with columns AR, S, SCAN_FIELDS, SCAN_STATS and the 
+    # aircraft parameters, e.g. for 
+    # results_io.to_grid(load_results(path), "AR", "S", "mO3")
+    ARvals, Svals = np.meshgrid(ARarray, Sarray, indexing="ij")
+    
+    columns = {"AR": ARvals.ravel(), "S": Svals.ravel()}
+    columns.update({field: result[field].ravel() 
+                    for field in SCAN_FIELDS + SCAN_STATS})
+    columns.update({name: np.full(ARvals.size, value) 
+                    for name, value in aircraft_parameters(aircraft).items()})
+    
+    save_results(path, columns)
+
 
 if __name__ == "__main__":
     
@@ -26,39 +363,18 @@ if __name__ == "__main__":
     
     ARvals, Svals = np.meshgrid(ARarray, Sarray, indexing="ij")  # 2D.
     
-    # initialize 2D output arrays
-    mO3vals   = np.zeros((nAR, nS))  # Objective function (g/s^3)
-    mpayvals  = np.zeros((nAR, nS))  # Payload mass (g)
-    Omegavals = np.zeros((nAR, nS))  # Turn rate (rad/s)
-    Rvals     = np.zeros((nAR, nS))  # Turn radius (m)
-    CLvals    = np.zeros((nAR, nS))  # Lift coefficient (-)
-    Tvals     = np.zeros((nAR, nS))  # Required thrust (N)
-    Tmaxvals  = np.zeros((nAR, nS))  # Maximum thrust (N)
-    dbvals    = np.zeros((nAR, nS))  # Wingtip deflection / wingspan
-    Nvals     = np.zeros((nAR, nS))  # load factor
-    
-    # Sweep over (AR, S)
-    for iAR,AR in enumerate(ARarray):
-        for iS,S in enumerate(Sarray):
-            
-            # Determine max objective
-            opt_vars, mO3, success = opt_mO3(aircraft, AR, S)
-            
-            if success:
-
-                V = aircraft.flight_velocity(opt_vars, AR, S)
-                
-                mO3vals[iAR,iS]   = mO3
-                mpayvals[iAR,iS]  = opt_vars[2]
-                Omegavals[iAR,iS] = aircraft.turn_rate(opt_vars, AR, S)
-                Rvals[iAR,iS]     = opt_vars[1]
-                CLvals[iAR,iS]    = aircraft.lift_coefficient(opt_vars, AR, S)
-                Tvals[iAR,iS]     = aircraft.required_thrust(opt_vars, AR, S)
-                Tmaxvals[iAR,iS]  = aircraft.maximum_thrust(V)
-                dbvals[iAR,iS]    = aircraft.wing_tip_deflection(opt_vars, AR, S)
-                Nvals[iAR,iS]     = opt_vars[0]
-            
-        print("Completed %3.1f%% of (AR,S) scan" % (100*(iAR+1)/nAR))
+    # Sweep over (AR, S): every grid point, or adaptively refined samples 
+    # (scan_adaptive) with the rest of the grid interpolated
+    adaptive = False
+    if adaptive:
+        samples, result = scan_adaptive(aircraft, ARarray, Sarray)
+        print("%d of %d grid points optimized" % (len(samples["AR"]), 
+                                                 nAR*nS))
+    else:
+        result = scan_grid(aircraft, ARarray, Sarray)
+    save_scan("scan_ARS.npz", aircraft, ARarray, Sarray, result)
+    
+    mO3vals = result["mO3"]
     
     # Find and print the optimal point (where mO3 is maximized)
     mO3_opt           = np.max(mO3vals)
@@ -73,123 +389,9 @@ if __name__ == "__main__":
     report_opt_mO3(aircraft, ARopt, Sopt)    
     
     
-    # Plotting commands
-    plt.ion()
-    plt.rc('axes', axisbelow=True)
-    plt.show()
-    get_ipython().run_line_magic('matplotlib', 'qt')
-    marker=(8,2,0)  # 8-sided asterisk
-    
-    # Objective function: mO3
-    fig1   = plt.figure(figsize=(4, 3.5), dpi=150)
-    levels = np.linspace(np.min(mO3vals[mO3vals > 0]), np.max(mO3vals), 21)
-    cs     = plt.contour(ARvals, Svals, mO3vals, levels=levels, linewidths=0.5)
-    plt.clabel(cs, colors="black", fontsize=7.0)
-    plt.plot(ARopt, Sopt, marker=marker, color="red", markersize=20)
-    plt.grid()
-    plt.xlabel("Aspect ratio (-)")
-    plt.ylabel("Wing area ($m^2$)")
-    plt.title("mO3 (g/s^3)")
-    plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92)
-    
-    # Payload mass
-    fig2   = plt.figure(figsize=(4, 3.5), dpi=150)
-    levels = np.linspace(np.min(mpayvals[mpayvals > 0]), np.max(mpayvals), 21)
-    cs     = plt.contour(ARvals, Svals, mpayvals, levels=levels, linewidths=0.5)
-    plt.clabel(cs, colors="black", fontsize=8.0)
-    plt.plot(ARopt, Sopt, marker=marker, color="red", markersize=20)
-    plt.grid()
-    plt.xlabel("Aspect ratio (-)")
-    plt.ylabel("Wing area ($m^2$)")
-    plt.title("Payload mass (g)")
-    plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92)    
-
-    # Turn rate
-    fig3   = plt.figure(figsize=(4, 3.5), dpi=150)
-    levels = np.linspace(np.min(Omegavals[Omegavals > 0]), np.max(Omegavals), 21)
-    cs     = plt.contour(ARvals, Svals, Omegavals, levels=levels, linewidths=0.5)
-    plt.clabel(cs, colors="black", fontsize=8.0)
-    plt.plot(ARopt, Sopt, marker=marker, color="red", markersize=20)
-    plt.grid()
-    plt.xlabel("Aspect ratio (-)")
-    plt.ylabel("Wing area ($m^2$)")
-    plt.title("Turn rate (rad/s)")
-    plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92)    
-    
-    # Turn radius
-    fig4   = plt.figure(figsize=(4, 3.5), dpi=150)
-    levels = np.linspace(np.min(Rvals[Rvals > 0]), np.max(Rvals), 21)
-    cs     = plt.contour(ARvals, Svals, Rvals, levels=levels, linewidths=0.5)
-    plt.clabel(cs, colors="black", fontsize=8.0)
-    plt.plot(ARopt, Sopt, marker=marker, color="red", markersize=20)
-    plt.grid()
-    plt.xlabel("Aspect ratio (-)")
-    plt.ylabel("Wing area ($m^2$)")
-    plt.title("Turn radius (m)")
-    plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92)       
-    
-    # Wing tip deflection
-    fig5 = plt.figure(figsize=(4, 3.5), dpi=150)
-    levels = np.linspace(np.min(dbvals[dbvals > 0]), np.max(dbvals), 11)
-    cs = plt.contour(ARvals, Svals, dbvals, levels=levels, linewidths=0.5)
-    plt.plot(ARopt, Sopt, marker=marker, color="red", markersize=20)
-    plt.clabel(cs, colors="black", fontsize=8.0)
-    plt.grid()
-    plt.xlabel("Aspect ratio (-)")
-    plt.ylabel("Wing area ($m^2$)")
-    plt.title("Wing Tip Deflection (-)")
-    plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92)
-    
-    # Lift coefficient
-    fig6 = plt.figure(figsize=(4, 3.5), dpi=150)
-    levels = np.linspace(np.min(CLvals[CLvals > 0]), np.max(CLvals), 11)
-    cs = plt.contour(ARvals, Svals, CLvals, levels=levels, linewidths=0.5)
-    plt.clabel(cs, colors="black")
-    plt.plot(ARopt, Sopt, marker=marker, color="red", markersize=20)
-    plt.grid()
-    plt.xlabel("Aspect ratio (-)")
-    plt.ylabel("Wing area ($m^2$)")
-    plt.title("Lift coefficient (-)")
-    plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92)
-    
-    # Thrust
-    fig7 = plt.figure(figsize=(4, 3.5), dpi=150)
-    levels = np.linspace(np.min(Tvals[Tvals > 0]), np.max(Tvals), 11)
-    cs = plt.contour(ARvals, Svals, Tvals, levels=levels, linewidths=0.5)
-    plt.plot(ARopt, Sopt, marker=marker, color="red", markersize=20)
-    plt.clabel(cs, colors="black", fontsize=7.0)
-    plt.grid()
-    plt.xlabel("Aspect ratio (-)")
-    plt.ylabel("Wing area ($m^2$)")
-    plt.title("Thrust (N)")
-    plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92) 
-    
-    # Maximum thrust
-    fig8 = plt.figure(figsize=(4, 3.5), dpi=150)
-    # Levels here are the same as for Tvals, so that thrust contours can be
-    # compared more easily
-    levels = np.linspace(np.min(Tvals[Tvals > 0]), np.max(Tvals), 11)
-    cs = plt.contour(ARvals, Svals, Tmaxvals, levels=levels, linewidths=0.5)
-    plt.plot(ARopt, Sopt, marker=marker, color="red", markersize=20)
-    plt.clabel(cs, colors="black", fontsize=7.0)
-    plt.grid()
-    plt.xlabel("Aspect ratio (-)")
-    plt.ylabel("Wing area ($m^2$)")
-    plt.title("Maximum Thrust (N)")
-    plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92)
-    
-    """
-    # Load factor
-    fig9 = plt.figure(figsize=(4, 3.5), dpi=150)
-    levels = np.linspace(np.min(Nvals[Nvals > 0]), np.max(Nvals), 11)
-    cs = plt.contour(ARvals, Svals, Nvals, levels=levels, linewidths=0.5)
-    plt.clabel(cs, colors="black", fontsize=8.0)
-    plt.grid()
-    plt.xlabel("Aspect ratio (-)")
-    plt.ylabel("Wing area ($m^2$)")
-    plt.title("Load Factor (-)")
-    plt.subplots_adjust(left=0.18, right=0.98, bottom=0.13, top=0.92)
-    """
-    
-    plt.show(block=True)
+    # Contours of the scan (matplotlib is only imported here)
+    import plotting
+    from matplotlib import pyplot as plt
     
+    plotting.plot_scan(ARarray, Sarray, result)
+    plt.show()
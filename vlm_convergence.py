@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spanwise mesh convergence of UEFC_wing: runs the same wing with different
+numbers of panels per semi-span (Nsemi) and measures the error of CL, CDi, e0
+and clmax against a Richardson-extrapolated reference
+"""
+
+import numpy as np
+import UEFC_wing
+
+# Panels per semi-span of the convergence study (10 to 200 panels). The last
+# three, each twice the previous, give the Richardson extrapolation.
+NSEMI_STUDY = (5, 10, 25, 50, 100)
+
+# Candidate Nsemi values of adaptive_wing, in increasing order
+NSEMI_CANDIDATES = (5, 10, 15, 20, 25, 30, 40, 50, 60, 80, 100)
+
+QUANTITIES = ("CL", "CDi", "e0", "clmax")
+
+
+def richardson(f1, f2, f4):
+    # Extrapolation to zero mesh size from values on meshes of size h, h/2
+    # and h/4, with the observed order of convergence p. Falls back to the
+    # finest value (and p = nan) when the differences do not converge
+    # monotonically.
+    d1 = f1 - f2
+    d2 = f2 - f4
+    if d1*d2 <= 0 or abs(d2) >= abs(d1):
+        return f4, np.nan
+
+    p = np.log2(d1/d2)
+    return f4 - d2/(2**p - 1), p
+
+
+def convergence_study(geometry, alpha=None, CL=None, Nsemis=NSEMI_STUDY):
+    # geometry: dict of UEFC_wing arguments (b, croot, ctip, agroot, agtip,
+    # dihedral). The wing is solved at the angle of attack alpha (degrees)
+    # or at the lift coefficient CL for each Nsemi in Nsemis; the last three
+    # Nsemis must each be twice the previous.
+    #
+    # Returns a dict with "Nsemi", the values of each quantity in QUANTITIES
+    # (arrays over Nsemis), their Richardson "reference" values, observed
+    # convergence "order" and relative "errors" (arrays over Nsemis).
+    if alpha is None and CL is None:
+        raise ValueError('you must define alpha or CL')
+
+    values = {name: [] for name in QUANTITIES}
+    for Nsemi in Nsemis:
+        wing = UEFC_wing.UEFC_wing(Nsemi=Nsemi, **geometry)
+        for name, value in zip(QUANTITIES, wing.aeroperf(alpha=alpha, CL=CL)):
+            values[name].append(value)
+
+    study = {"Nsemi": np.array(Nsemis), "reference": {}, "order": {},
+             "errors": {}}
+    for name in QUANTITIES:
+        f = np.array(values[name])
+        reference, order = richardson(*f[-3:])
+
+        study[name]              = f
+        study["reference"][name] = reference
+        study["order"][name]     = order
+        study["errors"][name]    = np.abs(f - reference)/abs(reference)
+
+    return study
+
+
+def print_study(study):
+    # Table of the relative errors of a convergence_study
+    print('Nsemi  panels' + ''.join('%10s' % name for name in QUANTITIES))
+    for i, Nsemi in enumerate(study["Nsemi"]):
+        print('%5d  %6d' % (Nsemi, 2*Nsemi) +
+              ''.join('%10.2e' % study["errors"][name][i]
+                      for name in QUANTITIES))
+    print('reference    ' + ''.join('%10.4f' % study["reference"][name]
+                                    for name in QUANTITIES))
+    print('order        ' + ''.join('%10.2f' % study["order"][name]
+                                    for name in QUANTITIES))
+
+
+def adaptive_wing(geometry, tol, alpha=None, CL=None,
+                  Nsemis=NSEMI_CANDIDATES):
+    # Wing with the smallest Nsemi of Nsemis whose CL, CDi, e0 and clmax are
+    # all within the relative tolerance tol of the Richardson reference of
+    # convergence_study. Returns the wing (None if no candidate meets tol)
+    # and the study.
+    study = convergence_study(geometry, alpha=alpha, CL=CL)
+
+    wing = None
+    for Nsemi in Nsemis:
+        wing = UEFC_wing.UEFC_wing(Nsemi=Nsemi, **geometry)
+        values = wing.aeroperf(alpha=alpha, CL=CL)
+        if all(abs(value - study["reference"][name])
+               <= tol*abs(study["reference"][name])
+               for name, value in zip(QUANTITIES, values)):
+            return wing, study
+
+    return None, study
+
+
+if __name__ == "__main__":
+
+    # The wing of vlm.py at alpha = 2 degrees
+    geometry = dict(b=1.5, croot=0.2, ctip=0.1, agroot=3.13, agtip=-5.0+3.13,
+                    dihedral=10.)
+
+    study = convergence_study(geometry, alpha=2.0)
+    print_study(study)
+
+    for tol in (1e-2, 3e-3):
+        wing, study = adaptive_wing(geometry, tol, alpha=2.0)
+        print()
+        if wing is None:
+            print('tol = {:.0e}: no candidate Nsemi is accurate enough'.format(tol))
+        else:
+            print('tol = {:.0e}: Nsemi = {:d}'.format(tol, wing.Nsemi))
@@ -0,0 +1,202 @@
+# Surrogate of the UEFC_wing vortex lattice results over the planform
+# parameters (AR, taper, twist, dihedral), built from a precomputed table of
+# VLM solutions.
+#
+# The VLM system is linear in alpha and all its outputs are dimensionless, so
+# a wing is described by its basis quantities (see UEFC_wing.get_basis): CL0,
+# CLa, the induced drag coefficients CDi0, CDi1, CDi2 and the sectional cl0
+# and cla distributions, for a wing of unit area. The
+# surrogate interpolates these with a tensor-product cubic spline, and e0 and
+# the CL at which the sectional cl reaches clmax follow from them as in
+# UEFC_wing.aeroperf and calc_CL_clmax. Outside the trained envelope it falls
+# back to a direct VLM solve.
+#
+# The results also depend slightly on the root incidence (through the panel
+# normals), so the table wings have the root incidence UEFC_wing.AGROOT of
+# the opt_m03_legit wings.
+
+import os
+import numpy as np
+from scipy.interpolate import make_interp_spline, NdBSpline
+
+import UEFC_wing
+from UEFC_wing import AGROOT
+
+# Default location of the table of VLM results
+SURROGATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "wing_surrogate.npz")
+
+# Increase when a change to UEFC_wing changes its results, so that tables
+# built before are rebuilt
+SURROGATE_VERSION = 1
+
+# Panels per semi-span of the table wings
+NSEMI = 50
+
+# Trained envelope: table points in each planform parameter
+AR_GRID       = np.linspace(4.,  16., 13)
+TAPER_GRID    = np.linspace(0.3, 1.,  8)
+TWIST_GRID    = np.linspace(-2., 8.,  6)   # agroot - agtip (degrees)
+DIHEDRAL_GRID = np.linspace(0.,  15., 4)   # degrees
+
+BASIS_SCALARS = ("CL0", "CLa", "CDi0", "CDi1", "CDi2")
+
+
+def planform_wing(AR, taper, twist, dihedral):
+
+    # UEFC_wing of unit area with the given planform, at root incidence AGROOT
+    b     = np.sqrt(AR)
+    croot = 2./(b*(1. + taper))
+
+    return UEFC_wing.UEFC_wing(b=b, croot=croot, ctip=taper*croot, agroot=AGROOT,
+                               agtip=AGROOT-twist, dihedral=dihedral,
+                               Nsemi=NSEMI)
+
+
+def basis_vector(wing):
+
+    # BASIS_SCALARS, cl0 and cla of a wing as one vector
+    basis = wing.get_basis()
+    return np.concatenate([[basis[name] for name in BASIS_SCALARS],
+                           basis["cl0"], basis["cla"]])
+
+
+def build_table(path=SURROGATE_FILE, verbose=True):
+
+    # Solve the VLM at every point of the envelope grids and save the basis
+    # vectors to path (about 2500 wings, a few seconds)
+    grids  = (AR_GRID, TAPER_GRID, TWIST_GRID, DIHEDRAL_GRID)
+    points = np.stack(np.meshgrid(*grids, indexing="ij"), axis=-1)
+
+    table = np.array([basis_vector(planform_wing(*point))
+                      for point in points.reshape(-1, 4)])
+    table = table.reshape(points.shape[:-1] + (-1,))
+
+    np.savez(path, version=SURROGATE_VERSION, Nsemi=NSEMI, agroot=AGROOT,
+             AR=AR_GRID, taper=TAPER_GRID, twist=TWIST_GRID,
+             dihedral=DIHEDRAL_GRID, table=table)
+    if verbose:
+        print("Saved %d VLM solutions to %s" % (len(points.reshape(-1, 4)),
+                                                path))
+
+
+def table_is_current(path):
+
+    # True if the table at path was built by this version, with the current
+    # grids, Nsemi and root incidence
+    with np.load(path) as data:
+        settings = {"version": SURROGATE_VERSION, "Nsemi": NSEMI,
+                    "agroot": AGROOT, "AR": AR_GRID, "taper": TAPER_GRID,
+                    "twist": TWIST_GRID, "dihedral": DIHEDRAL_GRID}
+        return all(name in data.files and
+                   np.shape(data[name]) == np.shape(value) and
+                   np.all(data[name] == value)
+                   for name, value in settings.items())
+
+
+class WingSurrogate:
+
+    # e0 and CL_at_clmax of a wing in microseconds instead of a VLM solve.
+    # The table is built (see build_table) if path does not exist yet, or
+    # rebuilt if it is out of date (see table_is_current).
+
+    def __init__(self, path=SURROGATE_FILE):
+        if not os.path.exists(path) or not table_is_current(path):
+            build_table(path)
+
+        with np.load(path) as data:
+            self.grids = tuple(data[name] for name in
+                               ("AR", "taper", "twist", "dihedral"))
+            table = data["table"]
+        self.nstations = (table.shape[-1] - len(BASIS_SCALARS))//2
+
+        # Tensor-product cubic interpolation: fit the spline coefficients one
+        # axis at a time
+        coefficients = table
+        knots = []
+        for axis, grid in enumerate(self.grids):
+            spline = make_interp_spline(grid, coefficients, k=3, axis=axis)
+            coefficients = np.moveaxis(spline.c, 0, axis)
+            knots.append(spline.t)
+        self.spline = NdBSpline(tuple(knots), coefficients, 3)
+
+        self.lower = np.array([grid[0]  for grid in self.grids])
+        self.upper = np.array([grid[-1] for grid in self.grids])
+
+
+    def in_envelope(self, AR, taper, twist, dihedral):
+        point = np.array([AR, taper, twist, dihedral], dtype=np.float64)
+        return bool(np.all(point >= self.lower) and np.all(point <= self.upper))
+
+
+    def basis(self, AR, taper, twist, dihedral):
+
+        # Basis quantities (as in UEFC_wing.get_basis, without G0 and Ga):
+        # interpolated inside the envelope, else solved
+        if self.in_envelope(AR, taper, twist, dihedral):
+            vector = self.spline([[AR, taper, twist, dihedral]])[0]
+        else:
+            vector = basis_vector(planform_wing(AR, taper, twist, dihedral))
+
+        n = len(BASIS_SCALARS)
+        basis = dict(zip(BASIS_SCALARS, vector[:n]))
+        basis["cl0"] = vector[n:n+self.nstations]
+        basis["cla"] = vector[n+self.nstations:]
+        return basis
+
+
+    def CL_at_clmax(self, AR, taper, twist, dihedral, clmax):
+
+        # Wing CL at which the maximum sectional cl first reaches clmax (see
+        # UEFC_wing.calc_CL_clmax)
+        basis  = self.basis(AR, taper, twist, dihedral)
+        cla    = basis["cla"]
+        up     = cla > 0
+        alphar = np.min((clmax-basis["cl0"][up])/cla[up])
+
+        return basis["CL0"] + alphar*basis["CLa"]
+
+
+    def e0(self, AR, taper, twist, dihedral, CL):
+
+        # Span efficiency at wing lift coefficient CL (see UEFC_wing.aeroperf)
+        basis  = self.basis(AR, taper, twist, dihedral)
+        alphar = (CL-basis["CL0"])/basis["CLa"]
+        CDi    = basis["CDi0"] + alphar*(basis["CDi1"] + alphar*basis["CDi2"])
+
+        return CL**2/(np.pi*AR*CDi)
+
+
+    def validate(self, nsamples=200, clmax=0.8, seed=0):
+
+        # Maximum and mean absolute errors of CL_at_clmax and of e0 at that
+        # CL against direct UEFC_wing solves, at random points of the envelope
+        rng    = np.random.default_rng(seed)
+        points = self.lower + rng.uniform(size=(nsamples, 4))*(self.upper -
+                                                               self.lower)
+        errors = []
+        for point in points:
+            wing = planform_wing(*point)
+            CL   = wing.calc_CL_clmax(clmax)
+            e0   = wing.aeroperf(CL=CL)[2]
+
+            CL_surrogate = self.CL_at_clmax(*point, clmax)
+            e0_surrogate = self.e0(*point, CL_surrogate)
+            errors.append((CL_surrogate - CL, e0_surrogate - e0))
+
+        errors = np.abs(errors)
+        return {"CL_at_clmax": {"max": errors[:,0].max(),
+                                "mean": errors[:,0].mean()},
+                "e0":          {"max": errors[:,1].max(),
+                                "mean": errors[:,1].mean()}}
+
+
+if __name__ == "__main__":
+
+    surrogate = WingSurrogate()
+
+    errors = surrogate.validate()
+    print("Surrogate error against UEFC_wing (200 random planforms):")
+    for name, error in errors.items():
+        print("%-12s max %0.2e, mean %0.2e" % (name, error["max"],
+                                                error["mean"]))